@@ -0,0 +1,7 @@
+"""
+Benchmarks for measuring nerodia's performance.
+
+Every benchmark is run from the repository root as a module,
+for example `python -m benchmarks.database`, and emits its
+results as JSON so that they can be compared between versions.
+"""
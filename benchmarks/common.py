@@ -0,0 +1,115 @@
+"""
+Helpers shared between the benchmarks.
+"""
+
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from nerodia.metrics import percentile
+
+
+def summarize(values: List[float], durations: bool = True) -> Dict[str, float]:
+    """Summarize the given measurements.
+
+    Args:
+        values (List[float]):
+            The measured value of every call.
+        durations (bool):
+            Whether the values are the durations of consecutive calls,
+            in seconds, from which the calls per second can be derived.
+            Pass `False` for counts or for overlapping durations.
+
+    Returns:
+        Dict[str, float]:
+            The amount of calls along with the mean, minimum, median,
+            99th percentile and maximum value. For durations, the calls
+            per second are included as well.
+    """
+
+    summary = {
+        "calls": len(values),
+        "mean": statistics.mean(values),
+        "min": min(values),
+        "p50": percentile(values, 0.5),
+        "p99": percentile(values, 0.99),
+        "max": max(values),
+    }
+    if durations:
+        total = sum(values)
+        summary["per_second"] = len(values) / total if total else float("inf")
+    return summary
+
+
+def time_calls(function: Callable[[], Any], iterations: int) -> List[float]:
+    """Call the given function repeatedly and measure every call.
+
+    Args:
+        function (Callable[[], Any]):
+            The function to call.
+        iterations (int):
+            How often the function should be called.
+
+    Returns:
+        List[float]:
+            The duration of every call, in seconds.
+    """
+
+    durations = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def resident_memory() -> int:
+    """Get the current resident set size of this process, in bytes.
+
+    Falls back to the peak resident set size
+    where `/proc` is not available.
+    """
+
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # `ru_maxrss` is in kilobytes on Linux, but in bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def environment() -> Dict[str, Optional[str]]:
+    """Describe the environment the benchmark is running in."""
+
+    try:
+        revision = subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+
+    return {
+        "revision": revision,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def write_results(results: Dict[str, Any], output: Optional[str]):
+    """Write the given results as JSON to the given file, or stdout."""
+
+    if output is None:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
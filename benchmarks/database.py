@@ -0,0 +1,194 @@
+"""
+Benchmarks the database queries of the Discord Bot consumer
+against synthetic SQLite databases of different sizes.
+
+Usage:
+    python -m benchmarks.database [--scale small medium large] [--output FILE]
+"""
+
+import argparse
+import asyncio
+import datetime
+import pathlib
+import random
+import sqlite3
+import tempfile
+import time
+from typing import Any, Dict
+
+import sqlalchemy
+
+from .common import environment, summarize, time_calls, write_results
+from nerodia.consumers.discordbot.database import common as common_db
+from nerodia.consumers.discordbot.database import guilds as guild_db
+from nerodia.consumers.discordbot.database import models
+from nerodia.database import create_engine_from_config
+from nerodia.twitch import TwitchUser
+
+
+# Maps scale names to `(follows, guilds)`.
+SCALES = {
+    "small": (1_000, 100),
+    "medium": (100_000, 10_000),
+    "large": (1_000_000, 100_000),
+}
+INSERT_BATCH_SIZE = 50_000
+
+
+def stream_count(follows: int) -> int:
+    """Get the amount of distinct streams to generate for the given follows."""
+
+    return max(100, follows // 10)
+
+
+def build_database(path: pathlib.Path, follows: int, guilds: int, seed: int):
+    """Create a synthetic database at the given path and bind the models to it.
+
+    Stream popularity is skewed, so that a few streams are followed
+    by many guilds while most streams only have a few followers.
+    """
+
+    engine = create_engine_from_config({"url": f"sqlite:///{path}"})
+    models.Base.metadata.create_all(engine)
+    models.bind(engine)
+
+    rng = random.Random(seed)
+    streams = stream_count(follows)
+    now = datetime.datetime.utcnow()
+    follows_per_guild, remainder = divmod(follows, guilds)
+
+    follow_rows = []
+    for guild_id in range(1, guilds + 1):
+        wanted = min(streams, follows_per_guild + (guild_id <= remainder))
+        followed = set()
+        while len(followed) < wanted:
+            followed.add(int(streams * rng.random() ** 3) + 1)
+        follow_rows.extend(
+            {"guild_id": guild_id, "stream_id": stream_id} for stream_id in followed
+        )
+
+    with engine.begin() as connection:
+        connection.execute(
+            models.Stream.__table__.insert(),
+            [
+                {
+                    "id": stream_id,
+                    "login": f"stream{stream_id}",
+                    "profile_image_url": "",
+                    "offline_image_url": "",
+                    "updated_at": now,
+                }
+                for stream_id in range(1, streams + 1)
+            ],
+        )
+        for n in range(0, len(follow_rows), INSERT_BATCH_SIZE):
+            connection.execute(
+                models.Follow.__table__.insert(),
+                follow_rows[n:n + INSERT_BATCH_SIZE],
+            )
+        connection.execute(
+            models.UpdateChannel.__table__.insert(),
+            [
+                {"guild_id": guild_id, "channel_id": guild_id * 10}
+                for guild_id in range(1, guilds + 1)
+            ],
+        )
+
+
+def run_scale(
+    directory: pathlib.Path, name: str, iterations: int, seed: int
+) -> Dict[str, Any]:
+    """Build the database for the given scale and time every query on it."""
+
+    follows, guilds = SCALES[name]
+    streams = stream_count(follows)
+    rng = random.Random(seed)
+    loop = asyncio.get_event_loop()
+
+    start = time.perf_counter()
+    build_database(directory / f"{name}.db", follows, guilds, seed)
+    build_seconds = time.perf_counter() - start
+
+    def random_guild() -> int:
+        return rng.randint(1, guilds)
+
+    def random_stream() -> int:
+        return int(streams * rng.random() ** 3) + 1
+
+    def follow_and_unfollow():
+        guild_id = random_guild()
+        users = [
+            TwitchUser(streams + n, f"newstream{n}", "", "") for n in range(1, 11)
+        ]
+        loop.run_until_complete(guild_db.follow(guild_id, *users))
+        loop.run_until_complete(
+            guild_db.unfollow(guild_id, *(user.name for user in users))
+        )
+
+    operations = {
+        "get_follows": lambda: guild_db.get_follows(random_guild()),
+        "get_guilds_following": lambda: guild_db.get_guilds_following(
+            random_stream()
+        ),
+        "get_update_channel": lambda: guild_db.get_update_channel(random_guild()),
+        "follow_and_unfollow_10": follow_and_unfollow,
+        "get_all_follows": common_db.get_all_follows,
+        "get_all_guild_follows": guild_db.get_all_guild_follows,
+    }
+    # Queries over the whole table are far more expensive, run them less often.
+    full_scans = {"get_all_follows", "get_all_guild_follows"}
+
+    results = {}
+    for operation, function in operations.items():
+        count = max(1, iterations // 100) if operation in full_scans else iterations
+        results[operation] = summarize(time_calls(function, count))
+
+    models.get_engine().dispose()
+    return {
+        "scale": name,
+        "follows": follows,
+        "guilds": guilds,
+        "streams": streams,
+        "build_seconds": build_seconds,
+        "operations": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--scale",
+        nargs="+",
+        choices=SCALES,
+        default=list(SCALES),
+        help="database sizes to benchmark",
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=1000, help="calls per operation"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", help="file to write the JSON results to")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="nerodia-bench-") as directory:
+        results = [
+            run_scale(pathlib.Path(directory), scale, args.iterations, args.seed)
+            for scale in args.scale
+        ]
+
+    write_results(
+        {
+            "benchmark": "database",
+            "environment": {
+                **environment(),
+                "sqlalchemy": sqlalchemy.__version__,
+                "sqlite": sqlite3.sqlite_version,
+            },
+            "results": results,
+        },
+        args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmarks finding the changed streams of a poll cycle, comparing
+the stream-by-stream comparison of the poller against the snapshot
+differ, with and without NumPy.
+
+Only the CPU time of finding the changes is measured, creating the
+snapshots and notifying consumers is left out.
+
+Usage:
+    python -m benchmarks.diffing [--streams N ...] [--churn FRACTION]
+                                 [--cycles N] [--output FILE]
+"""
+
+import argparse
+import random
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from .common import environment, summarize, write_results
+from nerodia.diffing import SnapshotDiffer
+from nerodia.twitch import TwitchStream
+
+
+# The fraction of streams that are online.
+ONLINE_FRACTION = 0.1
+
+Snapshot = Dict[int, Optional[TwitchStream]]
+
+
+def build_snapshots(streams: int, churn: float, cycles: int, seed: int) -> List:
+    """Build the snapshots of consecutive poll cycles.
+
+    Every cycle, a `churn` fraction of the streams goes on- or offline.
+    """
+
+    rng = random.Random(seed)
+    stream_ids = iter(range(1, 2 ** 62))
+    user_ids = list(range(1, streams + 1))
+
+    def new_stream(user_id: int) -> TwitchStream:
+        return TwitchStream(next(stream_ids), user_id, "", f"Stream of {user_id}")
+
+    snapshot = dict.fromkeys(user_ids)
+    for user_id in rng.sample(user_ids, round(streams * ONLINE_FRACTION)):
+        snapshot[user_id] = new_stream(user_id)
+
+    snapshots = [snapshot]
+    for _ in range(cycles):
+        snapshot = dict(snapshot)
+        for user_id in rng.sample(user_ids, round(streams * churn)):
+            snapshot[user_id] = None if snapshot[user_id] else new_stream(user_id)
+        snapshots.append(snapshot)
+    return snapshots
+
+
+def compare_streams() -> Callable[[Snapshot], List[int]]:
+    """Find changes like the poller does without a snapshot differ."""
+
+    state = {}
+
+    def diff(snapshot: Mapping[int, Optional[TwitchStream]]) -> List[int]:
+        changed = [
+            user_id
+            for user_id, stream in snapshot.items()
+            if state.get(user_id, stream) != stream
+        ]
+        state.update(snapshot)
+        return changed
+
+    return diff
+
+
+def differ(use_numpy: bool) -> Callable[[Snapshot], List[int]]:
+    """Find changes with a snapshot differ."""
+
+    snapshot_differ = SnapshotDiffer(use_numpy)
+
+    def diff(snapshot: Mapping[int, Optional[TwitchStream]]) -> List[int]:
+        changes = snapshot_differ.diff(snapshot)
+        return changes.online + changes.changed + changes.offline
+
+    return diff
+
+
+ENGINES = {
+    "compare": compare_streams,
+    "differ-python": lambda: differ(use_numpy=False),
+    "differ-numpy": lambda: differ(use_numpy=True),
+}
+
+
+def run(streams: int, churn: float, cycles: int, seed: int) -> Dict[str, Any]:
+    """Run every available engine on the same snapshots."""
+
+    snapshots = build_snapshots(streams, churn, cycles, seed)
+    engines = {
+        name: create
+        for name, create in ENGINES.items()
+        if name != "differ-numpy" or SnapshotDiffer().use_numpy
+    }
+
+    results = {}
+    for name, create in engines.items():
+        diff = create()
+        # The first snapshot only sets up the state to compare against.
+        diff(snapshots[0])
+
+        cpu_seconds, changes = [], []
+        for snapshot in snapshots[1:]:
+            start = time.process_time()
+            changed = diff(snapshot)
+            cpu_seconds.append(time.process_time() - start)
+            changes.append(len(changed))
+        results[name] = {
+            "cpu_seconds": summarize(cpu_seconds),
+            "changes_per_cycle": sum(changes) / len(changes),
+        }
+
+    return {"streams": streams, "churn": churn, "engines": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--streams",
+        nargs="+",
+        type=int,
+        default=[10_000, 100_000, 1_000_000],
+        help="amounts of followed streams to benchmark",
+    )
+    parser.add_argument(
+        "--churn",
+        type=float,
+        default=0.01,
+        help="fraction of streams that go on- or offline every cycle",
+    )
+    parser.add_argument("--cycles", type=int, default=10, help="poll cycles to run")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", help="file to write the JSON results to")
+    args = parser.parse_args()
+
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+
+    write_results(
+        {
+            "benchmark": "diffing",
+            "environment": {
+                **environment(),
+                "numpy": None if numpy is None else numpy.__version__,
+            },
+            "results": [
+                run(streams, args.churn, args.cycles, args.seed)
+                for streams in args.streams
+            ],
+        },
+        args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Profiles how long importing the entry points of nerodia takes,
+using the `-X importtime` option of Python 3.7 and newer.
+
+Every import is run in a fresh interpreter, and the modules
+with the highest own import time are reported for each entry point.
+
+Usage:
+    python -m benchmarks.importtime [--module MODULE ...] [--runs N]
+                                    [--top N] [--output FILE]
+"""
+
+import argparse
+import subprocess
+import sys
+from typing import Any, Dict, List, Tuple
+
+from .common import environment, summarize, write_results
+
+
+ENTRY_POINTS = [
+    "nerodia",
+    "nerodia.config",
+    "nerodia.database",
+    "nerodia.core",
+    "nerodia.pollers",
+    "nerodia.consumers.discordbot",
+    "nerodia.consumers.discordbot.database.models",
+]
+
+
+def import_times(module: str) -> List[Tuple[str, int, int, int]]:
+    """Import the given module in a fresh interpreter and record import times.
+
+    Args:
+        module (str):
+            The module to import.
+
+    Returns:
+        List[Tuple[str, int, int, int]]:
+            A `(module, level, self_us, cumulative_us)` tuple for every
+            module that was imported, where `level` is the nesting depth
+            of the import and times are in microseconds.
+    """
+
+    output = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    ).stderr
+
+    times = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        times.append((name.strip(), level, int(self_us), int(cumulative_us)))
+    return times
+
+
+def profile(module: str, runs: int, top: int) -> Dict[str, Any]:
+    """Profile importing the given module `runs` times."""
+
+    profiles = [import_times(module) for _ in range(runs)]
+    totals = [
+        sum(cumulative for _, level, _, cumulative in times if level == 0) / 1e6
+        for times in profiles
+    ]
+    fastest = profiles[totals.index(min(totals))]
+
+    return {
+        "module": module,
+        "modules_imported": len(fastest),
+        "seconds": summarize(totals),
+        "slowest_modules": [
+            {"module": name, "self_us": self_us, "cumulative_us": cumulative_us}
+            for name, _, self_us, cumulative_us in sorted(
+                fastest, key=lambda entry: entry[2], reverse=True
+            )[:top]
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--module",
+        nargs="+",
+        default=ENTRY_POINTS,
+        help="modules to profile importing",
+    )
+    parser.add_argument("--runs", type=int, default=5, help="imports per module")
+    parser.add_argument(
+        "--top", type=int, default=10, help="amount of slowest modules to report"
+    )
+    parser.add_argument("--output", help="file to write the JSON results to")
+    args = parser.parse_args()
+
+    if sys.version_info < (3, 7):
+        parser.error("profiling imports requires Python 3.7 or newer")
+
+    write_results(
+        {
+            "benchmark": "importtime",
+            "environment": environment(),
+            "results": [profile(module, args.runs, args.top) for module in args.module],
+        },
+        args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+Benchmarks the whole pipeline from polling to notifying:
+reading follows from SQLite, fetching their streams, diffing
+them against the previous cycle and notifying consumers.
+
+The Twitch API is replaced by an in-process fake and the
+consumer only records when it was notified, so the results
+measure nerodia itself rather than the network.
+
+Usage:
+    python -m benchmarks.pipeline [--follows N ...] [--churn FRACTION]
+                                  [--consumer-latency SECONDS] [--cycles N]
+                                  [--output FILE]
+"""
+
+import argparse
+import asyncio
+import collections
+import pathlib
+import random
+import tempfile
+import time
+import urllib.parse
+from typing import Any, Dict, Iterable, List
+
+from .common import environment, resident_memory, summarize, write_results
+from .database import build_database
+from nerodia.base import Consumer
+from nerodia.consumers.discordbot.database import common as common_db
+from nerodia.consumers.discordbot.database import models
+from nerodia.pollers import poll_once
+from nerodia.twitch import (
+    JSON,
+    USER_CACHE_SIZE,
+    TwitchClient,
+    TwitchStream,
+    TwitchUser,
+)
+
+
+# The fraction of followed streams that are online when the benchmark starts.
+ONLINE_FRACTION = 0.1
+
+
+class FakeHelix(TwitchClient):
+    """A Twitch client that answers requests from memory instead of the API."""
+
+    def __init__(self):
+        # Skip creating a HTTP session, no requests are sent.
+        self._cs = None
+        self._users_by_id = collections.OrderedDict()
+        self._users_cache_size = USER_CACHE_SIZE
+        self.requests = 0
+        self.user_requests = 0
+        # Maps the user IDs of online users to the ID of their stream.
+        self.online: Dict[int, int] = {}
+        self._stream_ids = iter(range(1, 2 ** 62))
+
+    def toggle(self, user_ids: Iterable[int]):
+        """Start streams of the given offline users and end those of online users."""
+
+        for user_id in user_ids:
+            if self.online.pop(user_id, None) is None:
+                self.online[user_id] = next(self._stream_ids)
+
+    async def _get(self, url: str, **kwargs) -> JSON:
+        self.requests += 1
+        parts = urllib.parse.urlsplit(url)
+        params = urllib.parse.parse_qs(parts.query)
+
+        if parts.path.endswith("/streams"):
+            user_ids = (int(user_id) for user_id in params.get("user_id", ()))
+            data = [
+                {
+                    "id": str(self.online[user_id]),
+                    "user_id": str(user_id),
+                    "thumbnail_url": "https://example.invalid/{width}x{height}.jpg",
+                    "title": f"Stream of user {user_id}",
+                }
+                for user_id in user_ids
+                if user_id in self.online
+            ]
+        else:
+            self.user_requests += 1
+            data = [
+                {
+                    "id": user_id,
+                    "login": f"stream{user_id}",
+                    "profile_image_url": "",
+                    "offline_image_url": "",
+                }
+                for user_id in params.get("id", ())
+            ]
+        return {"data": data}
+
+
+class RecordingConsumer(Consumer):
+    """A consumer that records how long it took to be notified about changes."""
+
+    name = "recorder"
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        # When the current batch of changes was made, by `time.perf_counter`.
+        self.changed_at = 0.0
+        self.latencies: List[float] = []
+
+    async def initialize(self, loop: asyncio.AbstractEventLoop):
+        pass
+
+    async def cleanup(self):
+        pass
+
+    async def stream_online(self, stream: TwitchStream, user: TwitchUser):
+        await self._notify()
+
+    async def stream_offline(self, user: TwitchUser):
+        await self._notify()
+
+    async def get_all_follows(self) -> Iterable[int]:
+        return common_db.get_all_follows()
+
+    async def load_module(self, module):
+        pass
+
+    async def unload_module(self, module_name: str):
+        pass
+
+    async def _notify(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.latencies.append(time.perf_counter() - self.changed_at)
+
+
+async def run_pipeline(
+    directory: pathlib.Path,
+    follows: int,
+    churn: float,
+    consumer_latency: float,
+    cycles: int,
+    seed: int,
+) -> Dict[str, Any]:
+    """Build a database with the given follows and run poll cycles against it."""
+
+    guilds = max(1, follows // 10)
+    build_database(directory / f"pipeline-{follows}.db", follows, guilds, seed)
+    rng = random.Random(seed)
+
+    streams = common_db.get_all_follows()
+    helix = FakeHelix()
+    helix.toggle(rng.sample(streams, round(len(streams) * ONLINE_FRACTION)))
+    consumer = RecordingConsumer(consumer_latency)
+    state = {}
+
+    # The first cycle only records the initial streams.
+    await poll_once([consumer], helix, state)
+    memory_before = resident_memory()
+
+    durations, api_calls, user_api_calls, notifications = [], [], [], []
+    for _ in range(cycles):
+        helix.toggle(rng.sample(streams, round(len(streams) * churn)))
+        requests, user_requests = helix.requests, helix.user_requests
+        notified = len(consumer.latencies)
+
+        consumer.changed_at = start = time.perf_counter()
+        await poll_once([consumer], helix, state)
+        durations.append(time.perf_counter() - start)
+        api_calls.append(helix.requests - requests)
+        user_api_calls.append(helix.user_requests - user_requests)
+        notifications.append(len(consumer.latencies) - notified)
+
+    memory_after = resident_memory()
+    models.get_engine().dispose()
+    return {
+        "follows": follows,
+        "streams": len(streams),
+        "churn": churn,
+        "consumer_latency": consumer_latency,
+        "cycle_seconds": summarize(durations),
+        "api_calls_per_cycle": summarize(api_calls, durations=False),
+        # Users are warmed up by the first cycle, so changes should need none.
+        "user_api_calls_per_cycle": summarize(user_api_calls, durations=False),
+        "notifications_per_cycle": summarize(notifications, durations=False),
+        # Latencies overlap, so calls per second can not be derived from them.
+        "notification_latency_seconds": summarize(consumer.latencies, durations=False)
+        if consumer.latencies
+        else None,
+        "memory": {
+            "resident_bytes": memory_after,
+            "growth_bytes": memory_after - memory_before,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--follows",
+        nargs="+",
+        type=int,
+        default=[1_000, 10_000, 100_000],
+        help="amounts of follows to benchmark",
+    )
+    parser.add_argument(
+        "--churn",
+        type=float,
+        default=0.01,
+        help="fraction of followed streams that go on- or offline every cycle",
+    )
+    parser.add_argument(
+        "--consumer-latency",
+        type=float,
+        default=0.0,
+        help="seconds the consumer takes to handle a single change",
+    )
+    parser.add_argument("--cycles", type=int, default=20, help="poll cycles to run")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--output", help="file to write the JSON results to")
+    args = parser.parse_args()
+
+    loop = asyncio.get_event_loop()
+    with tempfile.TemporaryDirectory(prefix="nerodia-bench-") as directory:
+        results = [
+            loop.run_until_complete(
+                run_pipeline(
+                    pathlib.Path(directory),
+                    follows,
+                    args.churn,
+                    args.consumer_latency,
+                    args.cycles,
+                    args.seed,
+                )
+            )
+            for follows in args.follows
+        ]
+
+    write_results(
+        {
+            "benchmark": "pipeline",
+            "environment": environment(),
+            "results": results,
+        },
+        args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Benchmarks the startup time and memory use of the Discord bot,
+with and without the low-memory mode.
+
+Every run logs in with the token from the configuration in a
+fresh process, so the results depend on the guilds of the bot.
+
+Usage:
+    python -m benchmarks.startup [--mode default low-memory] [--runs N]
+                                 [--settle SECONDS] [--output FILE]
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+import discord
+
+from .common import environment, resident_memory, summarize, write_results
+from nerodia.config import load_config
+from nerodia.consumers.discordbot.bot import NerodiaDiscordBot
+from nerodia.consumers.discordbot.routing import RoutingTable
+from nerodia.twitch import TwitchClient
+
+
+# Maps mode names to the value of the `low-memory` option.
+MODES = {"default": False, "low-memory": True}
+
+
+def measure(low_memory: bool, settle: float) -> Dict[str, Any]:
+    """Start the bot, wait until it is ready and measure it.
+
+    Args:
+        low_memory (bool):
+            Whether to run the bot in low-memory mode.
+        settle (float):
+            Seconds to keep the bot running after it became ready
+            before the steady-state memory use is measured.
+
+    Returns:
+        Dict[str, Any]:
+            The measurements of this run.
+    """
+
+    config = load_config()
+    bot_config = {**config["consumers"]["discordbot"], "low-memory": low_memory}
+    loop = asyncio.get_event_loop()
+    bot = NerodiaDiscordBot(
+        TwitchClient(config["producers"]["poller"]["client-id"]),
+        RoutingTable(),
+        {},
+        bot_config,
+    )
+    result = {}
+
+    async def run():
+        await bot.wait_until_ready()
+        result["ready_seconds"] = bot.startup_duration
+        result["ready_rss"] = resident_memory()
+        await asyncio.sleep(settle)
+        result["settled_rss"] = resident_memory()
+        result["guilds"] = len(bot.guilds)
+        result["members"] = sum(guild.member_count or 0 for guild in bot.guilds)
+        result["cached_members"] = sum(1 for _ in bot.get_all_members())
+        await bot.logout()
+
+    task = loop.create_task(run())
+    loop.run_until_complete(bot.start(bot_config["token"]))
+    loop.run_until_complete(task)
+    return result
+
+
+def run_mode(name: str, runs: int, settle: float) -> Dict[str, Any]:
+    """Measure the given mode in `runs` separate processes."""
+
+    measurements: List[Dict[str, Any]] = []
+    for _ in range(runs):
+        output = subprocess.check_output(
+            [sys.executable, "-m", "benchmarks.startup", "--child", name]
+            + ["--settle", str(settle)],
+            universal_newlines=True,
+        )
+        measurements.append(json.loads(output))
+
+    return {
+        "mode": name,
+        "guilds": measurements[-1]["guilds"],
+        "members": measurements[-1]["members"],
+        "cached_members": measurements[-1]["cached_members"],
+        "ready_seconds": summarize([m["ready_seconds"] for m in measurements]),
+        "ready_rss_bytes": max(m["ready_rss"] for m in measurements),
+        "settled_rss_bytes": max(m["settled_rss"] for m in measurements),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--mode",
+        nargs="+",
+        choices=MODES,
+        default=list(MODES),
+        help="modes to benchmark",
+    )
+    parser.add_argument("--runs", type=int, default=3, help="startups per mode")
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=60,
+        help="seconds to wait after startup before measuring steady-state memory",
+    )
+    parser.add_argument("--output", help="file to write the JSON results to")
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        json.dump(measure(MODES[args.child], args.settle), sys.stdout)
+        return
+
+    results = [run_mode(mode, args.runs, args.settle) for mode in args.mode]
+    write_results(
+        {
+            "benchmark": "startup",
+            "environment": {**environment(), "discord.py": discord.__version__},
+            "results": results,
+        },
+        args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
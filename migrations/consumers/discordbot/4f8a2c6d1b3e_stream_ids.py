@@ -0,0 +1,141 @@
+"""stream ids
+
+Revision ID: 4f8a2c6d1b3e
+Revises: 9c1d7e2b4a5f
+Create Date: 2026-10-19 13:48:02.901774
+
+"""
+import datetime
+import json
+import logging
+import urllib.request
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from nerodia.config import load_config
+
+
+# revision identifiers, used by Alembic.
+revision = "4f8a2c6d1b3e"
+down_revision = "9c1d7e2b4a5f"
+branch_labels = None
+depends_on = None
+
+USER_ENDPOINT = "https://api.twitch.tv/helix/users"
+log = logging.getLogger("alembic.runtime.migration")
+
+
+def resolve_users(logins):
+    """Resolve the given logins to Twitch user data, 100 logins per request."""
+
+    headers = {"Client-ID": load_config()["producers"]["poller"]["client-id"]}
+    for n in range(0, len(logins), 100):
+        url = USER_ENDPOINT + "?login=" + "&login=".join(logins[n:n + 100])
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as r:
+            yield from json.load(r)["data"]
+
+
+def upgrade():
+    if context.is_offline_mode():
+        raise RuntimeError(
+            "This migration resolves followed streams through the "
+            "Twitch API and can not be run in offline mode."
+        )
+
+    stream_table = op.create_table(
+        "discordbot_stream",
+        sa.Column("id", sa.BigInteger, primary_key=True, autoincrement=False),
+        sa.Column("login", sa.String(25), nullable=False),
+        sa.Column("profile_image_url", sa.String(255)),
+        sa.Column("offline_image_url", sa.String(255)),
+        sa.Column("updated_at", sa.DateTime, nullable=False),
+    )
+    op.create_index("ix_discordbot_stream_login", "discordbot_stream", ["login"])
+
+    connection = op.get_bind()
+    logins = sorted(
+        {
+            row[0].strip().lower()
+            for row in connection.execute(
+                sa.text("SELECT DISTINCT follows FROM discordbot_follow")
+            )
+        }
+    )
+    users = list(resolve_users(logins))
+    now = datetime.datetime.utcnow()
+    op.bulk_insert(
+        stream_table,
+        [
+            {
+                "id": int(user["id"]),
+                "login": user["login"],
+                "profile_image_url": user["profile_image_url"],
+                "offline_image_url": user["offline_image_url"],
+                "updated_at": now,
+            }
+            for user in users
+        ],
+    )
+
+    unresolved = set(logins) - {user["login"] for user in users}
+    if unresolved:
+        log.warning(
+            "Dropping follows of streams that no longer exist: "
+            + ", ".join(sorted(unresolved))
+        )
+
+    op.create_table(
+        "discordbot_follow_new",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("guild_id", sa.BigInteger, nullable=False),
+        sa.Column(
+            "stream_id",
+            sa.BigInteger,
+            sa.ForeignKey("discordbot_stream.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+    )
+    op.execute(
+        "INSERT INTO discordbot_follow_new (guild_id, stream_id) "
+        "SELECT DISTINCT f.guild_id, s.id FROM discordbot_follow f "
+        "JOIN discordbot_stream s ON lower(trim(f.follows)) = s.login"
+    )
+    op.drop_index("ix_discordbot_follow_guild_follows", "discordbot_follow")
+    op.drop_table("discordbot_follow")
+    op.rename_table("discordbot_follow_new", "discordbot_follow")
+    op.create_index(
+        "ix_discordbot_follow_guild_stream",
+        "discordbot_follow",
+        ["guild_id", "stream_id"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_discordbot_follow_stream_id", "discordbot_follow", ["stream_id"]
+    )
+
+
+def downgrade():
+    op.create_table(
+        "discordbot_follow_old",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("guild_id", sa.BigInteger, nullable=False),
+        sa.Column("follows", sa.String(30), nullable=False),
+    )
+    op.execute(
+        "INSERT INTO discordbot_follow_old (guild_id, follows) "
+        "SELECT f.guild_id, s.login FROM discordbot_follow f "
+        "JOIN discordbot_stream s ON f.stream_id = s.id"
+    )
+    op.drop_index("ix_discordbot_follow_stream_id", "discordbot_follow")
+    op.drop_index("ix_discordbot_follow_guild_stream", "discordbot_follow")
+    op.drop_table("discordbot_follow")
+    op.rename_table("discordbot_follow_old", "discordbot_follow")
+    op.create_index(
+        "ix_discordbot_follow_guild_follows",
+        "discordbot_follow",
+        ["guild_id", "follows"],
+        unique=True,
+    )
+    op.drop_index("ix_discordbot_stream_login", "discordbot_stream")
+    op.drop_table("discordbot_stream")
@@ -0,0 +1,7 @@
+-- Running upgrade 62ac6fa275d4 -> 9c1d7e2b4a5f
+
+DELETE FROM discordbot_follow WHERE id NOT IN (SELECT MIN(id) FROM discordbot_follow GROUP BY guild_id, follows);
+
+CREATE UNIQUE INDEX ix_discordbot_follow_guild_follows ON discordbot_follow (guild_id, follows);
+
+UPDATE alembic_version SET version_num='9c1d7e2b4a5f' WHERE alembic_version.version_num = '62ac6fa275d4';
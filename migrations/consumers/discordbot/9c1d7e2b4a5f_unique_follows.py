@@ -0,0 +1,35 @@
+"""unique follows
+
+Revision ID: 9c1d7e2b4a5f
+Revises: 62ac6fa275d4
+Create Date: 2026-10-19 10:12:41.513208
+
+"""
+from alembic import op
+import sqlalchemy as sa  # noqa
+
+
+# revision identifiers, used by Alembic.
+revision = "9c1d7e2b4a5f"
+down_revision = "62ac6fa275d4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Drop duplicate follows that may have been created before
+    # the unique index was introduced, keeping the oldest row.
+    op.execute(
+        "DELETE FROM discordbot_follow WHERE id NOT IN "
+        "(SELECT MIN(id) FROM discordbot_follow GROUP BY guild_id, follows)"
+    )
+    op.create_index(
+        "ix_discordbot_follow_guild_follows",
+        "discordbot_follow",
+        ["guild_id", "follows"],
+        unique=True,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_discordbot_follow_guild_follows", "discordbot_follow")
@@ -0,0 +1,15 @@
+-- Running upgrade 4f8a2c6d1b3e -> c3a9e5d7f1b2
+
+CREATE TABLE discordbot_outbox (
+    stream_id BIGINT NOT NULL, 
+    event_id VARCHAR(32) NOT NULL, 
+    name VARCHAR(25) NOT NULL, 
+    payload TEXT NOT NULL, 
+    channel_ids TEXT, 
+    attempts INTEGER NOT NULL, 
+    next_attempt_at DATETIME NOT NULL, 
+    created_at DATETIME NOT NULL, 
+    PRIMARY KEY (stream_id)
+);
+
+UPDATE alembic_version SET version_num='c3a9e5d7f1b2' WHERE alembic_version.version_num = '4f8a2c6d1b3e';
@@ -0,0 +1,34 @@
+"""outbox
+
+Revision ID: c3a9e5d7f1b2
+Revises: 4f8a2c6d1b3e
+Create Date: 2026-10-19 15:02:37.118410
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c3a9e5d7f1b2"
+down_revision = "4f8a2c6d1b3e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "discordbot_outbox",
+        sa.Column("stream_id", sa.BigInteger, primary_key=True, autoincrement=False),
+        sa.Column("event_id", sa.String(32), nullable=False),
+        sa.Column("name", sa.String(25), nullable=False),
+        sa.Column("payload", sa.Text, nullable=False),
+        sa.Column("channel_ids", sa.Text),
+        sa.Column("attempts", sa.Integer, nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime, nullable=False),
+        sa.Column("created_at", sa.DateTime, nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("discordbot_outbox")
@@ -0,0 +1,7 @@
+-- Running upgrade c3a9e5d7f1b2 -> e8b2d4f6a1c9
+
+ALTER TABLE discordbot_updatechannel ADD COLUMN webhook_id BIGINT;
+
+ALTER TABLE discordbot_updatechannel ADD COLUMN webhook_token VARCHAR(100);
+
+UPDATE alembic_version SET version_num='e8b2d4f6a1c9' WHERE alembic_version.version_num = 'c3a9e5d7f1b2';
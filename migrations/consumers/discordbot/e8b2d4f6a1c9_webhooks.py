@@ -0,0 +1,30 @@
+"""webhooks
+
+Revision ID: e8b2d4f6a1c9
+Revises: c3a9e5d7f1b2
+Create Date: 2026-10-19 16:24:05.730912
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e8b2d4f6a1c9"
+down_revision = "c3a9e5d7f1b2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("discordbot_updatechannel", sa.Column("webhook_id", sa.BigInteger))
+    op.add_column(
+        "discordbot_updatechannel", sa.Column("webhook_token", sa.String(100))
+    )
+
+
+def downgrade():
+    # SQLite can not drop columns, so the table is recreated in batch mode.
+    with op.batch_alter_table("discordbot_updatechannel") as batch_op:
+        batch_op.drop_column("webhook_token")
+        batch_op.drop_column("webhook_id")
@@ -3,6 +3,9 @@ from logging.config import fileConfig
 from alembic import context
 from sqlalchemy import engine_from_config, pool
 
+from nerodia.config import load_config
+from nerodia.database import get_database_url
+
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -12,6 +15,13 @@ config = context.config
 # This line sets up loggers basically.
 fileConfig(config.config_file_name)
 
+# Use the same database as nerodia itself, as set up in its
+# configuration file or through the `NERODIA_DB_PATH` variable.
+config.set_main_option(
+    "sqlalchemy.url",
+    get_database_url(load_config().get("database")).replace("%", "%%"),
+)
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
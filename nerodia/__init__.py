@@ -1,3 +1,15 @@
-from . import consumers, config, decorators, pollers, twitch
+import importlib
 
-__all__ = ["consumers", "config", "decorators", "pollers", "twitch"]
+__all__ = ["consumers", "config", "decorators", "metrics", "pollers", "twitch"]
+
+
+def __getattr__(name: str):
+    """Import submodules on first access, so that importing nerodia stays cheap.
+
+    Only takes effect on Python 3.7 and newer. On older versions,
+    submodules must be imported explicitly before accessing them.
+    """
+
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
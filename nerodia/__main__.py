@@ -4,30 +4,74 @@ Configures logging and starts everything up.
 """
 
 
-import asyncio
+import argparse
+import functools
 import logging
 
-from .config import CONFIG
+from . import ipc
+from .config import DEFAULT_CONFIG_PATH, load_config
 from .core import Nerodia
+from .eventloop import create_event_loop
+from .log import setup_logging
 from .pollers import stream_poller
 from .twitch import TwitchClient
 
 
-logging.basicConfig(
-    format="%(asctime)s | %(name)45s | %(funcName)22s | %(levelname)8s | %(message)s",
-    datefmt="%d.%m.%y %H:%M:%S",
-    level=logging.INFO,
-)
-
 log = logging.getLogger(__name__)
 logging.getLogger("discord").setLevel(logging.ERROR)
 
 
+# Maps roles to whether they poll Twitch and whether they run the consumers.
+ROLES = {"all": (True, True), "producer": (True, False), "consumer": (False, True)}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="nerodia")
+    parser.add_argument(
+        "--config", default=DEFAULT_CONFIG_PATH, help="the configuration file to use"
+    )
+    parser.add_argument(
+        "--role",
+        choices=ROLES,
+        default="all",
+        help=(
+            "run everything in this process, or only the producer or the "
+            "consumers, which then talk to each other over a Unix socket"
+        ),
+    )
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    loop = asyncio.get_event_loop()
+    args = parse_args()
+    config = load_config(args.config)
+    log_listener = setup_logging(config.get("logging"))
+    loop = create_event_loop(config.get("event-loop"))
+
+    nerodia = Nerodia(config, loop)
+    twitch_client = TwitchClient(config["producers"]["poller"]["client-id"])
+
+    polls, consumes = ROLES[args.role]
+    differ = None
+    if polls and config["producers"]["poller"].get("snapshot-diff", False):
+        # Only imported when enabled, since the differ loads NumPy if installed.
+        from .diffing import SnapshotDiffer
 
-    nerodia = Nerodia(CONFIG, loop)
-    twitch_client = TwitchClient(CONFIG["producers"]["poller"]["client-id"])
+        differ = SnapshotDiffer()
+    socket_path = config.get("ipc", {}).get("socket", ipc.DEFAULT_SOCKET_PATH)
+    if not consumes:
+        # Consumers and their modules run in the consumer processes instead.
+        config["consumers"]["enabled"] = []
+        config["modules"]["enabled"] = []
+        poller = ipc.producer(socket_path, differ)
+    elif not polls:
+        poller = ipc.consumer(socket_path)
+    else:
+        poller = functools.partial(stream_poller, differ=differ)
 
-    nerodia.run(twitch_client, stream_poller)
-    loop.close()
+    try:
+        nerodia.run(twitch_client, poller)
+        loop.close()
+    finally:
+        # Write out any records that are still queued.
+        log_listener.stop()
@@ -1,10 +1,13 @@
 import asyncio
 from abc import ABCMeta, abstractmethod
-from typing import Iterable
+from typing import TYPE_CHECKING, Iterable
 
-# from nerodia.base import Module
-from nerodia.core import Nerodia
-from nerodia.twitch import TwitchClient, TwitchStream, TwitchUser
+# Only imported for type checking, so that defining a consumer
+# does not pull in the Twitch client and its HTTP dependencies.
+if TYPE_CHECKING:
+    from nerodia.base import Module
+    from nerodia.core import Nerodia
+    from nerodia.twitch import TwitchClient, TwitchStream, TwitchUser
 
 
 class Consumer(metaclass=ABCMeta):
@@ -15,7 +18,7 @@ class Consumer(metaclass=ABCMeta):
     """
 
     @abstractmethod
-    def __init__(self, twitch_client: TwitchClient, nerodia: Nerodia):
+    def __init__(self, twitch_client: "TwitchClient", nerodia: "Nerodia"):
         """Set up the consumer and its attributes.
 
         Args:
@@ -44,7 +47,7 @@ class Consumer(metaclass=ABCMeta):
         """Run any code that is required to run before nerodia exits."""
 
     @abstractmethod
-    async def stream_online(self, stream: TwitchStream, user: TwitchUser):
+    async def stream_online(self, stream: "TwitchStream", user: "TwitchUser"):
         """
         Called when the given stream changes state to online.
 
@@ -56,7 +59,7 @@ class Consumer(metaclass=ABCMeta):
         """
 
     @abstractmethod
-    async def stream_offline(self, user: TwitchUser):
+    async def stream_offline(self, user: "TwitchUser"):
         """
         Called when the given user's stream goes offline.
 
@@ -66,14 +69,14 @@ class Consumer(metaclass=ABCMeta):
         """
 
     @abstractmethod
-    async def get_all_follows(self) -> Iterable[str]:
+    async def get_all_follows(self) -> Iterable[int]:
         """
         Get an iterable of all followed streamers that are known to this consumer.
 
         Returns:
-            Iterable[str]:
-                An iterable of stream names that are
-                being followed on this consumer.
+            Iterable[int]:
+                An iterable of Twitch user IDs of the
+                streams that are being followed on this consumer.
         """
 
     @abstractmethod
@@ -1,5 +1,30 @@
+"""
+Loads the configuration of nerodia.
+
+The configuration is parsed once on startup through
+`load_config` and passed on to the parts that need it,
+so that importing any part of nerodia does not read it.
+"""
+
+from typing import Any, Dict
+
 import yaml
 
 
-with open("config.yml") as f:
-    CONFIG = yaml.safe_load(f)
+DEFAULT_CONFIG_PATH = "config.yml"
+
+
+def load_config(path: str = DEFAULT_CONFIG_PATH) -> Dict[str, Any]:
+    """Read and parse the configuration file.
+
+    Args:
+        path (str):
+            The path to the configuration file.
+
+    Returns:
+        Dict[str, Any]:
+            The parsed configuration.
+    """
+
+    with open(path) as f:
+        return yaml.safe_load(f)
@@ -1,11 +1,14 @@
 import logging
+import time
+from typing import Any, Dict, Mapping, Optional
 
 import discord
 from discord.ext import commands
 
 from . import cog
-from nerodia.config import CONFIG
-from nerodia.twitch import TwitchClient
+from .dashboard import DashboardCache
+from .routing import RoutingTable
+from nerodia.twitch import TwitchClient, TwitchStream
 
 
 DESCRIPTION = (
@@ -15,26 +18,77 @@ DESCRIPTION = (
 log = logging.getLogger(__name__)
 
 
+def low_memory_options() -> Dict[str, Any]:
+    """Get the client options which turn off caching and chunking of members.
+
+    nerodia only needs guilds and channels to route announcements,
+    so keeping every member in memory is wasted on big bots.
+
+    Returns:
+        Dict[str, Any]:
+            Keyword arguments for the client supported by the
+            installed version of discord.py. Newer versions configure
+            the member cache through flags, while older versions
+            only allow turning off fetching offline members.
+    """
+
+    if hasattr(discord, "MemberCacheFlags"):
+        return {
+            "member_cache_flags": discord.MemberCacheFlags.none(),
+            "chunk_guilds_at_startup": False,
+        }
+    return {"fetch_offline_members": False}
+
+
 class NerodiaDiscordBot(commands.AutoShardedBot):
     """The Discord bot that nerodia runs on."""
 
-    def __init__(self, twitch: TwitchClient):
-        """Instantiate the Discord bot and attach the Twitch client to it."""
+    def __init__(
+        self,
+        twitch: TwitchClient,
+        routes: RoutingTable,
+        streams: Mapping[int, Optional[TwitchStream]],
+        config: Dict[str, Any],
+    ):
+        """Instantiate the Discord bot and attach the Twitch client,
+        the stream routing table and the live stream state to it.
+        The given configuration is the `discordbot` consumer section."""
+
+        options = {}
+        if config.get("low-memory", False):
+            options.update(low_memory_options())
 
         super().__init__(
-            command_prefix=commands.when_mentioned_or(
-                CONFIG["consumers"]["discordbot"]["prefix"]
-            ),
+            command_prefix=commands.when_mentioned_or(config["prefix"]),
             description=DESCRIPTION,
             pm_help=True,
-            game=discord.Game(name=CONFIG["consumers"]["discordbot"]["game"]),
+            game=discord.Game(name=config["game"]),
+            shard_count=config.get("shard-count"),
+            shard_ids=config.get("shard-ids"),
+            **options,
         )
+        self.created_at = time.monotonic()
+        self.startup_duration = None
         self.twitch = twitch
+        self.routes = routes
+        self.streams = streams
+        self.dashboards = DashboardCache()
+        # Set by the consumer when announcements are delivered through webhooks.
+        self.webhooks = None
         cog.setup(self)
 
     async def on_ready(self):
-        total_members = sum(1 for _ in self.get_all_members())
-        log.info(f"Discord Bot is ready, seeing {total_members} members.")
+        # `on_ready` is dispatched again after reconnecting.
+        if self.startup_duration is None:
+            self.startup_duration = time.monotonic() - self.created_at
+
+        # Guilds report their member count, so this neither walks every cached
+        # member nor depends on members being cached at all.
+        total_members = sum(guild.member_count or 0 for guild in self.guilds)
+        log.info(
+            f"Discord Bot is ready after {self.startup_duration:.1f}s, seeing "
+            f"{len(self.guilds)} guilds with about {total_members} members."
+        )
 
     async def close(self):
         await super().close()
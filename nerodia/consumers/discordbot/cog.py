@@ -3,17 +3,29 @@ Contains the command group
 used for the Discord Bot.
 """
 
+import asyncio
 import datetime
 import logging
+from typing import Callable, Tuple
 
+import aiohttp
 import discord
 from discord.ext import commands
 from discord.ext.commands import Context
 
 from .database import guilds as guild_db
+from .embeds import create_dashboard_embed
 
 log = logging.getLogger(__name__)
 
+# The reactions used to go to the previous and the next page.
+PAGE_REACTIONS = (
+    "\N{BLACK LEFT-POINTING TRIANGLE}",
+    "\N{BLACK RIGHT-POINTING TRIANGLE}",
+)
+# How many seconds to wait for a reaction before pagination stops.
+PAGINATION_TIMEOUT = 120
+
 
 class NerodiaDiscordCog:
 
@@ -26,33 +38,98 @@ class NerodiaDiscordCog:
         """A dashboard for information about the Guild.
 
         Shows which streams the guild
-        this is invoked on is following.
+        this is invoked on is following,
+        and which of them are live.
+
+        Long lists of follows are split into pages,
+        which can be browsed by reacting with the arrows.
 
         Aliased to `db`.
         """
 
-        configured_update_channel = guild_db.get_update_channel(ctx.guild.id)
-        if configured_update_channel is None:
+        summary = self.bot.dashboards.get(ctx.guild.id)
+        if summary.update_channel_id is None:
             update_channel = "No update channel set."
         else:
-            update_channel = self.bot.get_channel(configured_update_channel)
+            update_channel = self.bot.get_channel(summary.update_channel_id)
             if update_channel is None:
                 guild_db.unset_update_channel(ctx.guild.id)
+                self.bot.routes.unset_channel(ctx.guild.id)
+                self.bot.dashboards.invalidate(ctx.guild.id)
                 update_channel = "No update channel set."
             else:
                 update_channel = update_channel.mention
 
-        await ctx.send(
-            embed=discord.Embed(colour=discord.Colour.blue()).set_author(
-                name=f"Guild Dashboard for {ctx.guild.name}",
-                icon_url=ctx.guild.icon_url,
-            ).add_field(
-                name="Followed Streams",
-                value=", ".join(guild_db.get_follows(ctx.guild.id)) or "No follows :(",
-            ).add_field(
-                name="Stream Update Channel", value=update_channel
+        pages = summary.pages()
+
+        def render(page: int) -> discord.Embed:
+            # Rendered on every page change, so that the live status stays current.
+            return create_dashboard_embed(
+                ctx.guild,
+                update_channel,
+                pages[page],
+                self.bot.streams,
+                page,
+                len(pages),
             )
-        )
+
+        message = await ctx.send(embed=render(0))
+        if len(pages) > 1:
+            await self._paginate(ctx, message, len(pages), render)
+
+    async def _paginate(
+        self,
+        ctx: Context,
+        message: discord.Message,
+        page_count: int,
+        render: Callable[[int], discord.Embed],
+    ):
+        """Lets the invoking user browse the pages of the given message.
+
+        Args:
+            ctx (Context):
+                The invocation context of the paginated command.
+            message (discord.Message):
+                The message showing the first page.
+            page_count (int):
+                The total amount of pages.
+            render (Callable[[int], discord.Embed]):
+                Creates the embed for the page with the given number.
+        """
+
+        for emoji in PAGE_REACTIONS:
+            await message.add_reaction(emoji)
+
+        def check(reaction: discord.Reaction, user: discord.User) -> bool:
+            return (
+                reaction.message.id == message.id
+                and user == ctx.author
+                and str(reaction.emoji) in PAGE_REACTIONS
+            )
+
+        page = 0
+        while True:
+            try:
+                reaction, user = await self.bot.wait_for(
+                    "reaction_add", check=check, timeout=PAGINATION_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                break
+
+            step = -1 if str(reaction.emoji) == PAGE_REACTIONS[0] else 1
+            page = (page + step) % page_count
+            await message.edit(embed=render(page))
+
+            # Removing reactions of others requires the manage messages permission.
+            try:
+                await message.remove_reaction(reaction.emoji, user)
+            except discord.HTTPException:
+                pass
+
+        try:
+            await message.clear_reactions()
+        except discord.HTTPException:
+            pass
 
     @commands.command()
     @commands.has_permissions(manage_channels=True)
@@ -70,23 +147,27 @@ class NerodiaDiscordCog:
 
         await ctx.trigger_typing()
 
-        valid_streams = [
-            s for s in stream_names if await self.bot.twitch.get_user(s) is not None
-        ]
-        present_follows = guild_db.get_follows(ctx.guild.id)
-        unique_streams = set(s for s in valid_streams if s not in present_follows)
+        users = await self.bot.twitch.resolve_users(*stream_names)
+        followed = await guild_db.follow(ctx.guild.id, *users.values())
+        self.bot.routes.follow(ctx.guild.id, *(user.id for user in followed))
+        # Following stored the current login of every given stream.
+        for user in users.values():
+            self.bot.routes.set_login(user.id, user.name)
+        self.bot.dashboards.invalidate(ctx.guild.id)
+        followed_names = [user.name for user in followed]
 
-        await guild_db.follow(ctx.guild.id, *unique_streams)
         await ctx.send(
             embed=discord.Embed(
                 title="Follow command",
                 colour=discord.Colour.blue(),
                 timestamp=datetime.datetime.now(),
             ).add_field(
-                name="Newly followed:", value=", ".join(unique_streams) or "None!"
+                name="Newly followed:", value=", ".join(followed_names) or "None!"
             ).add_field(
                 name="Failed to follow:",
-                value=", ".join(s for s in stream_names if s not in unique_streams)
+                value=", ".join(
+                    s for s in stream_names if s.strip().lower() not in followed_names
+                )
                 or "None!",
             )
         )
@@ -107,10 +188,13 @@ class NerodiaDiscordCog:
 
         await ctx.trigger_typing()
 
-        unique_streams = set(stream_names)
-        old_follows = guild_db.get_follows(ctx.guild.id)
-        unfollowed = [s for s in unique_streams if s in old_follows]
-        await guild_db.unfollow(ctx.guild.id, *unique_streams)
+        unique_streams = set(s.lower() for s in stream_names)
+        unfollowed_streams = await guild_db.unfollow(ctx.guild.id, *unique_streams)
+        self.bot.routes.unfollow(
+            ctx.guild.id, *(stream_id for stream_id, _ in unfollowed_streams)
+        )
+        self.bot.dashboards.invalidate(ctx.guild.id)
+        unfollowed = [login for _, login in unfollowed_streams]
 
         await ctx.send(
             embed=discord.Embed(
@@ -139,20 +223,52 @@ class NerodiaDiscordCog:
         if channel is None:
             channel = ctx.message.channel
 
-        if guild_db.get_update_channel(ctx.guild.id) is not None:
-            guild_db.unset_update_channel(ctx.guild.id)
-        guild_db.set_update_channel(ctx.guild.id, channel.id)
+        description = (
+            f"Set the stream update announcement channel to {channel.mention}."
+        )
+        webhook = None
+        if self.bot.webhooks is not None:
+            try:
+                created = await channel.create_webhook(name="nerodia")
+                webhook = (created.id, created.token)
+            except discord.HTTPException as e:
+                log.warning(f"Could not create a webhook in channel {channel.id}: {e}")
+                description += (
+                    "\nI couldn't create a webhook in it, so I will post "
+                    "announcements myself. Give me the Manage Webhooks "
+                    "permission and set the channel again to use a webhook."
+                )
+
+        previous_channel = self.bot.routes.channel_of(ctx.guild.id)
+        previous_webhook = (
+            None
+            if previous_channel is None
+            else self.bot.routes.webhook_for(previous_channel)
+        )
+
+        try:
+            guild_db.set_update_channel(ctx.guild.id, channel.id, webhook)
+        except Exception:
+            # Nothing refers to the new webhook, so it would never be deleted.
+            if webhook is not None:
+                await self._delete_webhook(webhook)
+            raise
+        self.bot.routes.set_channel(ctx.guild.id, channel.id, webhook)
+        self.bot.dashboards.invalidate(ctx.guild.id)
 
         await ctx.send(
-            embed=discord.Embed(
-                description=(
-                    "Set the stream update announcement "
-                    f"channel to {channel.mention}."
-                ),
-                colour=discord.Colour.green(),
-            )
+            embed=discord.Embed(description=description, colour=discord.Colour.green())
         )
 
+        if previous_webhook is not None and self.bot.webhooks is not None:
+            await self._delete_webhook(previous_webhook)
+
+    async def _delete_webhook(self, webhook: Tuple[int, str]):
+        try:
+            await self.bot.webhooks.delete(*webhook)
+        except (discord.HTTPException, aiohttp.ClientError) as e:
+            log.warning(f"Could not delete webhook {webhook[0]}: {e}")
+
     @setchannel.error
     async def setchannel_error(_, ctx: Context, error: commands.CommandError):
         """The error handler for the `setchannel` command.
@@ -2,14 +2,19 @@ import asyncio
 import logging
 from typing import Iterable
 
+import discord
+
 from .bot import NerodiaDiscordBot
+from .database import common as common_db
 from .database import guilds as guild_db
-from .database.common import session as db_session
-from .database.models import Follow
-from .embeds import create_stream_online_embed
+from .database import models
+from .embeds import render_stream_online
+from .fanout import Announcement, ShardedFanOut
+from .outbox import Outbox, OutboxEvent
+from .routing import RoutingTable
+from .webhooks import DEFAULT_BASE_URL, WebhookClient
 from nerodia.base import Consumer, Module
 from nerodia.core import Nerodia
-from nerodia.config import CONFIG
 from nerodia.twitch import TwitchClient, TwitchStream, TwitchUser
 
 log = logging.getLogger(__name__)
@@ -19,46 +24,141 @@ class DiscordBotConsumer(Consumer):
     name = "discordbot"
 
     def __init__(self, twitch_client: TwitchClient, nerodia: Nerodia):
-        self.bot = NerodiaDiscordBot(twitch_client)
+        self.config = nerodia.config["consumers"]["discordbot"]
+        self.routes = RoutingTable()
+        self.bot = NerodiaDiscordBot(
+            twitch_client, self.routes, nerodia.streams, self.config
+        )
         self.bot_task = None
+        self.fanout = None
+        self.outbox = None
+        self.webhooks = None
         self.nerodia = nerodia
         self.modules = set()
 
     async def initialize(self, loop: asyncio.AbstractEventLoop):
-        token = CONFIG["consumers"]["discordbot"]["token"]
+        models.configure(self.nerodia.config.get("database"))
+        self.routes.load()
+        delivery_config = self.config.get("delivery", {})
+        max_concurrency = delivery_config.get("max-concurrency", 50)
+        if delivery_config.get("mode", "bot") == "webhook":
+            self.webhooks = self.bot.webhooks = WebhookClient(
+                delivery_config.get("webhook-base-url", DEFAULT_BASE_URL),
+                max_connections=max_concurrency,
+            )
+
+        self.fanout = ShardedFanOut(
+            loop,
+            max_concurrency=max_concurrency,
+            shard_count=self.bot.shard_count,
+            shard_ids=self.bot.shard_ids,
+            # Webhooks are executed without the gateway connection of the bot.
+            wait_for_shards=self.webhooks is None,
+        )
+        self.outbox = Outbox(
+            loop, self.deliver, max_attempts=delivery_config.get("retry-attempts", 10)
+        )
+        self.bot.add_listener(self.on_shard_ready, "on_shard_ready")
+        self.bot.add_listener(self.on_shard_ready, "on_shard_resumed")
+        self.bot.add_listener(self.on_shard_disconnect, "on_shard_disconnect")
+        token = self.config["token"]
         self.bot_task = loop.create_task(self.bot.start(token))
         log.info("Started Discord Bot in background.")
+        self.outbox.start()
 
     async def cleanup(self):
+        if self.outbox is not None:
+            await self.outbox.close()
+        if self.fanout is not None:
+            await self.fanout.close()
+        if self.webhooks is not None:
+            await self.webhooks.close()
         if self.bot_task is not None:
             await self.bot.logout()
 
     async def stream_online(self, stream: TwitchStream, user: TwitchUser):
-        followers = guild_db.get_guilds_following(user.name)
+        # Only the login is read back from the database, so it is only written
+        # when the stream was renamed, keeping the database off the hot path.
+        if self.routes.login_of(user.id) != user.name:
+            # Dashboards show the login, so they are outdated once a stream renames.
+            for stream_id in common_db.refresh_streams(user):
+                for guild_id in self.routes.followers_of(stream_id):
+                    self.bot.dashboards.invalidate(guild_id)
+            self.routes.set_login(user.id, user.name)
+
+        # Render the embed once, the same payload is sent to every channel.
+        self.outbox.append(user.id, user.name, render_stream_online(stream, user))
+
+    async def deliver(self, event: OutboxEvent) -> Announcement:
+        """Queue the given outbox event for delivery to its channels.
+
+        Args:
+            event (OutboxEvent):
+                The event to deliver.
+
+        Returns:
+            Announcement:
+                Tracks the delivery of the event.
+        """
 
-        for guild_id in followers:
-            update_channel_id = guild_db.get_update_channel(guild_id)
-            if update_channel_id is None:
+        # Channels can only be looked up once the bot has connected,
+        # which also makes the shard count known.
+        await self.bot.wait_until_ready()
+        self.fanout.shard_count = self.bot.shard_count
+
+        targets = []
+        for guild_id, channel_id in self.routes.channels_for(event.stream_id):
+            if event.channel_ids is not None and channel_id not in event.channel_ids:
+                continue
+            if not self.fanout.is_local(guild_id):
+                continue
+            if self.bot.get_channel(channel_id) is None:
                 log.warning(
-                    f"Guild {guild_id} is following {user.name!r}"
-                    "but has no update channel set."
+                    f"Update channel {channel_id} for {event.name!r} "
+                    "is set, but it could not be found."
                 )
             else:
-                channel = self.bot.get_channel(update_channel_id)
-                if channel is None:
+                targets.append((guild_id, channel_id))
+
+        async def send(channel_id: int):
+            webhook = None
+            if self.webhooks is not None:
+                webhook = self.routes.webhook_for(channel_id)
+
+            if webhook is not None:
+                try:
+                    headers = await self.webhooks.execute(*webhook, event.payload)
+                except discord.HTTPException as e:
+                    if e.status not in (401, 404):
+                        raise
+                    # The webhook was deleted, so the bot posts announcements
+                    # itself until the channel is set again.
                     log.warning(
-                        f"Guild {guild_id} has an update channel set, "
-                        "but it could not be found."
+                        f"Webhook of update channel {channel_id} is gone, "
+                        f"posting announcements through the bot instead: {e}"
                     )
+                    self.routes.clear_webhook(channel_id)
+                    guild_db.clear_webhook(channel_id, webhook[0])
                 else:
-                    embed = create_stream_online_embed(stream, user)
-                    await channel.send(embed=embed)
+                    self.fanout.rate_limiter.observe(channel_id, headers)
+                    return
+
+            await self.bot.http.send_message(channel_id, None, embed=event.payload)
+
+        return self.fanout.announce(event.name, targets, send)
+
+    async def on_shard_ready(self, shard_id: int):
+        self.fanout.set_ready(shard_id, True)
+
+    async def on_shard_disconnect(self, shard_id: int):
+        log.warning(f"Shard {shard_id} disconnected, holding back its deliveries.")
+        self.fanout.set_ready(shard_id, False)
 
     async def stream_offline(self, user: TwitchUser):
         pass
 
-    async def get_all_follows(self) -> Iterable[str]:
-        return (f.follows for f in db_session.query(Follow))
+    async def get_all_follows(self) -> Iterable[int]:
+        return common_db.get_all_follows()
 
     async def load_module(self, module: Module):
         await module.attach(self)
@@ -0,0 +1,73 @@
+"""
+Caches the per-guild summaries
+shown on the guild dashboard.
+"""
+
+import collections
+from typing import List, NamedTuple, Optional, Tuple
+
+from .database import guilds as guild_db
+
+
+# The amount of followed streams shown on a single dashboard page.
+PAGE_SIZE = 15
+
+
+class GuildSummary(NamedTuple):
+    follows: List[Tuple[int, str]]
+    update_channel_id: Optional[int]
+
+    def pages(self) -> List[List[Tuple[int, str]]]:
+        """Split the followed streams into pages of `PAGE_SIZE` streams.
+
+        Returns:
+            List[List[Tuple[int, str]]]:
+                The `(stream_id, login)` pairs on each page.
+                A guild without follows has a single, empty page.
+        """
+
+        return [
+            self.follows[n:n + PAGE_SIZE]
+            for n in range(0, len(self.follows), PAGE_SIZE)
+        ] or [[]]
+
+
+class DashboardCache:
+    """Caches the dashboard summaries of recently viewed guilds.
+
+    A summary is read from the database when the dashboard of its
+    guild is first shown, and is kept until a command changes the
+    follows or the update channel of the guild, or a followed stream
+    is renamed, and invalidates it.
+    Once more than `max_size` guilds are cached, the summary
+    of the least recently viewed guild is evicted.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self._max_size = max_size
+        self._summaries = collections.OrderedDict()
+
+    def get(self, guild_id: int) -> GuildSummary:
+        """Get the summary of the given guild, reading it on a cache miss."""
+
+        summary = self._summaries.get(guild_id)
+        if summary is not None:
+            self._summaries.move_to_end(guild_id)
+            return summary
+
+        summary = GuildSummary(
+            guild_db.get_followed_streams(guild_id),
+            guild_db.get_update_channel(guild_id),
+        )
+        self._summaries[guild_id] = summary
+        if len(self._summaries) > self._max_size:
+            self._summaries.popitem(last=False)
+        return summary
+
+    def invalidate(self, guild_id: int):
+        """Drop the cached summary of the given guild after it changed."""
+
+        self._summaries.pop(guild_id, None)
+
+    def __len__(self) -> int:
+        return len(self._summaries)
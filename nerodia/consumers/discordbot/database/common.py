@@ -4,33 +4,153 @@ as functions for both the Discord
 and the Reddit interface.
 """
 
-from typing import List
+import datetime
+from typing import Iterable, Iterator, List, Sequence, TypeVar
 
-from .models import session, Follow
+from sqlalchemy import Table, bindparam, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Insert
 
+from . import models as db
+from nerodia.twitch import TwitchUser
 
-def is_followed(stream_name: str) -> bool:
+
+# SQLite versions before 3.32 allow at most 999 bound parameters per statement.
+MAX_PARAMETERS = 900
+T = TypeVar("T")
+
+
+def chunked(items: Sequence[T], size: int = MAX_PARAMETERS) -> Iterator[Sequence[T]]:
+    """Split the given sequence into chunks of at most `size` items."""
+
+    return (items[n:n + size] for n in range(0, len(items), size))
+
+
+def insert_ignore(connection: Connection, table: Table) -> Insert:
+    """Build an `INSERT` statement that skips rows violating a unique constraint.
+
+    Args:
+        connection (Connection):
+            The connection the statement will be executed on.
+            Used to determine the dialect-specific syntax.
+        table (Table):
+            The table to insert into.
+
+    Returns:
+        Insert:
+            An `INSERT ... ON CONFLICT DO NOTHING` statement for
+            PostgreSQL, or an `INSERT OR IGNORE` statement for SQLite.
+    """
+
+    if connection.dialect.name == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing()
+    return table.insert().prefix_with("OR IGNORE")
+
+
+def _stream_rows(users: Iterable[TwitchUser]) -> List[dict]:
+    now = datetime.datetime.utcnow()
+    return [
+        {
+            "id": user.id,
+            "login": user.name,
+            "profile_image_url": user.profile_image_url,
+            "offline_image_url": user.offline_image_url,
+            "updated_at": now,
+        }
+        for user in users
+    ]
+
+
+def _update_stream_rows(connection: Connection, rows: List[dict]):
+    table = db.Stream.__table__
+
+    # Bound parameter names must not clash with column names in `UPDATE` statements.
+    connection.execute(
+        table.update()
+        .where(table.c.id == bindparam("b_id"))
+        .values({name: bindparam(f"b_{name}") for name in rows[0] if name != "id"}),
+        [{f"b_{name}": value for name, value in row.items()} for row in rows],
+    )
+
+
+def upsert_streams(connection: Connection, users: Iterable[TwitchUser]):
+    """Create or refresh the cached stream information for the given users.
+
+    Args:
+        connection (Connection):
+            The connection on which the statements should be executed.
+        users (Iterable[TwitchUser]):
+            The Twitch users whose information should be stored.
+    """
+
+    rows = _stream_rows(users)
+    if rows:
+        connection.execute(insert_ignore(connection, db.Stream.__table__), rows)
+        _update_stream_rows(connection, rows)
+
+
+def refresh_streams(*users: TwitchUser) -> List[int]:
+    """Refresh the cached stream information of already known users.
+
+    Keeps the cached login up-to-date when a followed streamer renames,
+    which is required for looking up follows by their stream name.
+
+    Args:
+        users (TwitchUser):
+            An argument list of Twitch users whose information should be updated.
+
+    Returns:
+        List[int]:
+            The Twitch user IDs of the known users whose login changed.
+    """
+
+    rows = _stream_rows(users)
+    if not rows:
+        return []
+
+    table = db.Stream.__table__
+    logins = {user.id: user.name for user in users}
+    query = select([table.c.id, table.c.login]).where(table.c.id.in_(list(logins)))
+    with db.get_engine().begin() as connection:
+        renamed = [
+            stream_id
+            for stream_id, login in connection.execute(query)
+            if login != logins[stream_id]
+        ]
+        _update_stream_rows(connection, rows)
+    return renamed
+
+
+def is_followed(stream_id: int) -> bool:
     """Checks whether a given stream is followed by either a Subreddit or a Guild.
 
     Args:
-        stream_name (str):
-            The stream which should be checked.
+        stream_id (int):
+            The Twitch user ID of the stream which should be checked.
 
     Returns:
         bool:
             Whether a Subreddit or Guild follows the stream or not.
     """
 
-    res = session.query(Follow).filter(Follow.follows == stream_name).first()
-    return res is not None
+    follows = db.Follow.__table__
+    query = select([follows.c.id]).where(follows.c.stream_id == stream_id).limit(1)
 
+    with db.get_engine().connect() as connection:
+        return connection.execute(query).first() is not None
 
-def get_all_follows() -> List[str]:
+
+def get_all_follows() -> List[int]:
     """Gets all follows present in the `Follow` database.
 
     Returns:
-        List[str]:
-            A list of Twitch names of followed streams.
+        List[int]:
+            A list of Twitch user IDs of followed streams.
     """
 
-    return [row[0] for row in session.query(Follow.follows).distinct().all()]
+    follows = db.Follow.__table__
+    query = select([follows.c.stream_id]).distinct()
+
+    with db.get_engine().connect() as connection:
+        return [stream_id for (stream_id,) in connection.execute(query)]
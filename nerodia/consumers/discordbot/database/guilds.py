@@ -4,9 +4,13 @@ common database queries
 revolving around Discord guilds.
 """
 
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple
+
+from sqlalchemy import and_, select
 
 from . import models as db
+from .common import chunked, insert_ignore, upsert_streams
+from nerodia.twitch import TwitchUser
 
 
 def get_follows(guild_id: int) -> List[str]:
@@ -22,77 +26,240 @@ def get_follows(guild_id: int) -> List[str]:
             A list of Twitch stream names that the guild is following.
     """
 
-    result = db.session.query(db.Follow.follows).filter(db.Follow.guild_id == guild_id)
-    return [s for row_tuple in result for s in row_tuple]
+    return [login for _, login in get_followed_streams(guild_id)]
 
 
-def get_guilds_following(stream_name: str) -> List[int]:
+def get_followed_streams(guild_id: int) -> List[Tuple[int, str]]:
     """
-    Get a list of guild IDs following the given channel.
+    Returns the streams which the given Discord Guild ID is following.
 
     Arguments:
-        stream_name (str):
-            The stream name which following guild IDs should be returned.
+        guild_id (int):
+            The Guild for which to obtain the follows.
+    Returns:
+        List[Tuple[int, str]]:
+            A list of `(stream_id, login)` pairs, ordered by login.
+    """
+
+    follows = db.Follow.__table__
+    streams = db.Stream.__table__
+    query = (
+        select([streams.c.id, streams.c.login])
+        .select_from(streams.join(follows, follows.c.stream_id == streams.c.id))
+        .where(follows.c.guild_id == guild_id)
+        .order_by(streams.c.login)
+    )
+
+    with db.get_engine().connect() as connection:
+        return [tuple(row) for row in connection.execute(query)]
+
+
+def get_guilds_following(stream_id: int) -> List[int]:
+    """
+    Get a list of guild IDs following the given stream.
+
+    Arguments:
+        stream_id (int):
+            The Twitch user ID of the stream whose
+            following guild IDs should be returned.
 
     Returns:
         List[int]:
             A list of guilds that are following the given stream.
     """
 
-    return [
-        row.guild_id
-        for row in db.session.query(db.Follow).filter(
-            db.Follow.follows == stream_name
-        ).filter(
-            db.Follow.guild_id.isnot(None)
-        )
-    ]
+    follows = db.Follow.__table__
+    query = select([follows.c.guild_id]).where(follows.c.stream_id == stream_id)
+
+    with db.get_engine().connect() as connection:
+        return [guild_id for (guild_id,) in connection.execute(query)]
+
+
+def get_all_guild_follows() -> List[Tuple[int, int]]:
+    """
+    Returns every follow of every guild.
+
+    Returns:
+        List[Tuple[int, int]]:
+            A list of `(guild_id, stream_id)` pairs.
+    """
+
+    follows = db.Follow.__table__
+    query = select([follows.c.guild_id, follows.c.stream_id])
+
+    with db.get_engine().connect() as connection:
+        return [tuple(row) for row in connection.execute(query)]
+
+
+def get_all_followed_logins() -> Dict[int, str]:
+    """
+    Returns the cached login of every
+    stream that a guild follows.
+
+    Returns:
+        Dict[int, str]:
+            Maps the Twitch user IDs of followed streams to their login.
+    """
+
+    follows = db.Follow.__table__
+    streams = db.Stream.__table__
+    query = (
+        select([streams.c.id, streams.c.login])
+        .select_from(streams.join(follows, follows.c.stream_id == streams.c.id))
+        .distinct()
+    )
+
+    with db.get_engine().connect() as connection:
+        return dict(tuple(row) for row in connection.execute(query))
+
+
+def get_all_update_channels() -> Dict[int, int]:
+    """
+    Returns the update channels of every guild.
+
+    Returns:
+        Dict[int, int]:
+            Maps guild IDs to the ID of their update channel.
+    """
+
+    channels = db.UpdateChannel.__table__
+    query = select([channels.c.guild_id, channels.c.channel_id])
+
+    with db.get_engine().connect() as connection:
+        return dict(connection.execute(query).fetchall())
 
 
-async def follow(guild_id: int, *stream_names: str):
+def get_all_webhooks() -> Dict[int, Tuple[int, str]]:
+    """
+    Returns the webhooks of every update channel which has one.
+
+    Returns:
+        Dict[int, Tuple[int, str]]:
+            Maps channel IDs to the `(webhook_id, webhook_token)`
+            of the webhook created in the channel.
     """
-    Follows the given argument list of streams
+
+    channels = db.UpdateChannel.__table__
+    query = select(
+        [channels.c.channel_id, channels.c.webhook_id, channels.c.webhook_token]
+    ).where(channels.c.webhook_id.isnot(None))
+
+    with db.get_engine().connect() as connection:
+        return {
+            channel_id: (webhook_id, webhook_token)
+            for channel_id, webhook_id, webhook_token in connection.execute(query)
+        }
+
+
+async def follow(guild_id: int, *users: TwitchUser) -> List[TwitchUser]:
+    """
+    Follows the given argument list of Twitch users
     with the given Discord guild.
 
+    The cached stream information for the given users is refreshed
+    and all follows are inserted in a single transaction. Streams
+    which the guild is already following are skipped by the
+    database instead of in Python.
+
     Arguments:
         guild_id (int):
-            The Guild ID which should follow the given argument list of streams.
-        stream_names (str):
-            An argument list of stream names to follow.
-    """
-
-    db.session.add_all(db.Follow(stream, guild_id=guild_id) for stream in stream_names)
-    db.session.commit()
+            The Guild ID which should follow the given argument list of users.
+        users (TwitchUser):
+            An argument list of Twitch users whose streams to follow.
 
+    Returns:
+        List[TwitchUser]:
+            The users which were not followed by
+            the guild before and are followed now.
+    """
 
-async def unfollow(guild_id: int, *stream_names: str):
+    table = db.Follow.__table__
+    requested = list({user.id: user for user in users}.values())
+    followed = []
+
+    with db.get_engine().begin() as connection:
+        upsert_streams(connection, requested)
+
+        for chunk in chunked(requested):
+            present = {
+                row.stream_id
+                for row in connection.execute(
+                    table.select().where(
+                        and_(
+                            table.c.guild_id == guild_id,
+                            table.c.stream_id.in_([user.id for user in chunk]),
+                        )
+                    )
+                )
+            }
+            followed.extend(user for user in chunk if user.id not in present)
+
+        if followed:
+            connection.execute(
+                insert_ignore(connection, table),
+                [{"guild_id": guild_id, "stream_id": user.id} for user in followed],
+            )
+
+    return followed
+
+
+async def unfollow(guild_id: int, *stream_names: str) -> List[Tuple[int, str]]:
     """
     Unfollow the given argument list of streams
     on the Discord Guild with the given ID.
 
+    Stream names are matched case-insensitively against the
+    cached logins, and all follows are deleted in a single transaction.
+
     Arguments:
         guild_id (int):
             The Discord Guild ID for the guild on which the
             given argument list of streams should be unfollowed.
         stream_names (str):
             An argument list of stream names to unfollow.
-    """
-
-    db.session.query(db.Follow).filter(db.Follow.guild_id == guild_id).filter(
-        db.Follow.follows.in_(stream_names)
-    ).delete(
-        synchronize_session="fetch"
-    )
-    db.session.commit()
 
+    Returns:
+        List[Tuple[int, str]]:
+            `(stream_id, login)` pairs of the streams which were
+            followed by the guild and are no longer followed now.
+    """
 
-def set_update_channel(guild_id: int, channel_id: int):
+    table = db.Follow.__table__
+    streams = db.Stream.__table__
+    requested = list(dict.fromkeys(name.strip().lower() for name in stream_names))
+    unfollowed = []
+
+    with db.get_engine().begin() as connection:
+        for chunk in chunked(requested):
+            present = connection.execute(
+                streams.select()
+                .select_from(streams.join(table, table.c.stream_id == streams.c.id))
+                .where(and_(table.c.guild_id == guild_id, streams.c.login.in_(chunk)))
+            ).fetchall()
+            if present:
+                connection.execute(
+                    table.delete().where(
+                        and_(
+                            table.c.guild_id == guild_id,
+                            table.c.stream_id.in_([row.id for row in present]),
+                        )
+                    )
+                )
+                unfollowed.extend((row.id, row.login) for row in present)
+
+    return unfollowed
+
+
+def set_update_channel(
+    guild_id: int, channel_id: int, webhook: Optional[Tuple[int, str]] = None
+):
     """
     Sets the stream announcement channel
     for the given Guild ID to the given
     channel ID, resulting in all stream
     updates for streams that the guild
     is following to be posted in it.
+    A previously set channel is replaced.
 
     Arguments:
         guild_id (int):
@@ -100,10 +267,53 @@ def set_update_channel(guild_id: int, channel_id: int):
         channel_id (int):
             The channel ID for the channel in which the
             stream update announcements should be posted.
+        webhook (Optional[Tuple[int, str]]):
+            The `(webhook_id, webhook_token)` of the webhook
+            created in the channel, if announcements
+            should be delivered through it.
+    """
+
+    webhook_id, webhook_token = webhook or (None, None)
+
+    with db.session_scope() as session:
+        session.query(db.UpdateChannel).filter(
+            db.UpdateChannel.guild_id == guild_id
+        ).delete(
+            synchronize_session=False
+        )
+        session.add(
+            db.UpdateChannel(
+                guild_id=guild_id,
+                channel_id=channel_id,
+                webhook_id=webhook_id,
+                webhook_token=webhook_token,
+            )
+        )
+
+
+def clear_webhook(channel_id: int, webhook_id: int):
     """
+    Removes the given webhook from the update
+    channel it was created in, for example
+    because it was deleted in Discord.
+    Announcements for the channel are then
+    posted by the bot itself.
 
-    db.session.add(db.UpdateChannel(guild_id=guild_id, channel_id=channel_id))
-    db.session.commit()
+    Arguments:
+        channel_id (int):
+            The update channel the webhook was created in.
+        webhook_id (int):
+            The ID of the webhook to remove. If the channel
+            has a different webhook by now, it is kept.
+    """
+
+    with db.session_scope() as session:
+        session.query(db.UpdateChannel).filter(
+            db.UpdateChannel.channel_id == channel_id,
+            db.UpdateChannel.webhook_id == webhook_id,
+        ).update(
+            {"webhook_id": None, "webhook_token": None}, synchronize_session=False
+        )
 
 
 def unset_update_channel(guild_id: int):
@@ -118,12 +328,12 @@ def unset_update_channel(guild_id: int):
             be unset.
     """
 
-    db.session.query(db.UpdateChannel).filter(
-        db.UpdateChannel.guild_id == guild_id
-    ).delete(
-        synchronize_session="fetch"
-    )
-    db.session.commit()
+    with db.session_scope() as session:
+        session.query(db.UpdateChannel).filter(
+            db.UpdateChannel.guild_id == guild_id
+        ).delete(
+            synchronize_session=False
+        )
 
 
 def get_update_channel(guild_id: int) -> Optional[int]:
@@ -141,10 +351,8 @@ def get_update_channel(guild_id: int) -> Optional[int]:
             or `None` if no channel was set.
     """
 
-    result = db.session.query(db.UpdateChannel).filter(
-        db.UpdateChannel.guild_id == guild_id
-    ).first()
+    channels = db.UpdateChannel.__table__
+    query = select([channels.c.channel_id]).where(channels.c.guild_id == guild_id)
 
-    if result is not None:
-        return result.channel_id
-    return None
+    with db.get_engine().connect() as connection:
+        return connection.execute(query).scalar()
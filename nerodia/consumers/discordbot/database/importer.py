@@ -0,0 +1,143 @@
+"""
+Provides bulk importing of guild follows
+from CSV or JSON Lines files, for example
+when migrating from another bot.
+
+CSV files must contain one `guild_id,stream`
+pair per row, optionally preceded by a header.
+JSON Lines files must contain one object with
+the keys `guild_id` and `stream` per line.
+
+Stream names are resolved to Twitch users in
+concurrent batches of 100 through the Twitch API.
+Names that are not valid Twitch logins are skipped.
+The import can be run from the command line:
+    python -m nerodia.consumers.discordbot.database.importer follows.csv
+
+Since the Discord consumer only loads its routing
+table on startup, nerodia should be restarted
+after importing follows while it is running.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import pathlib
+from typing import Iterable, Iterator, Tuple
+
+from sqlalchemy import text
+
+from . import models as db
+from .common import chunked, insert_ignore, upsert_streams
+from nerodia.config import load_config
+from nerodia.twitch import TwitchClient
+
+
+log = logging.getLogger(__name__)
+
+
+def read_follows(path: pathlib.Path) -> Iterator[Tuple[int, str]]:
+    """Read follows from the given CSV or JSON Lines file.
+
+    Args:
+        path (pathlib.Path):
+            The file to read follows from. Files with the
+            suffix `.jsonl` or `.json` are parsed as JSON Lines,
+            any other file is parsed as CSV.
+
+    Yields:
+        Tuple[int, str]:
+            A `(guild_id, stream_name)` pair for each follow in the file.
+    """
+
+    with path.open(newline="") as f:
+        if path.suffix in (".jsonl", ".json"):
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    yield int(entry["guild_id"]), entry["stream"].strip().lower()
+        else:
+            for row in csv.reader(f):
+                # Skip empty rows and the optional header.
+                if row and row[0].strip().isdigit():
+                    yield int(row[0]), row[1].strip().lower()
+
+
+async def import_follows(
+    twitch_client: TwitchClient,
+    follows: Iterable[Tuple[int, str]],
+    batch_size: int = 5000,
+) -> int:
+    """Insert the given follows in a single transaction.
+
+    Follows which are already present are skipped by the database,
+    and follows of streams that do not exist or whose names are not
+    valid Twitch logins are skipped and logged.
+
+    Args:
+        twitch_client (TwitchClient):
+            The Twitch client used to resolve stream names.
+        follows (Iterable[Tuple[int, str]]):
+            An iterable of `(guild_id, stream_name)` pairs to insert.
+        batch_size (int):
+            How many rows to send to the database per statement.
+
+    Returns:
+        int:
+            The amount of follows that were newly created.
+    """
+
+    follows = list(dict.fromkeys(follows))
+    stream_names = list(dict.fromkeys(stream_name for _, stream_name in follows))
+    users = await twitch_client.resolve_users(*stream_names)
+    skipped = [stream_name for stream_name in stream_names if stream_name not in users]
+    if skipped:
+        log.warning(
+            f"Skipping follows of {len(skipped)} streams that are not valid "
+            f"Twitch logins or do not exist: {', '.join(map(repr, skipped[:20]))}"
+            f"{', ...' if len(skipped) > 20 else ''}"
+        )
+
+    table = db.Follow.__table__
+    rows = [
+        {"guild_id": guild_id, "stream_id": users[stream_name].id}
+        for guild_id, stream_name in follows
+        if stream_name in users
+    ]
+    count_query = text(f"SELECT COUNT(*) FROM {table.name}")
+
+    with db.get_engine().begin() as connection:
+        upsert_streams(connection, users.values())
+        count_before = connection.execute(count_query).scalar()
+        statement = insert_ignore(connection, table)
+        for batch in chunked(rows, batch_size):
+            connection.execute(statement, list(batch))
+        count_after = connection.execute(count_query).scalar()
+
+    return count_after - count_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import guild follows.")
+    parser.add_argument(
+        "files", nargs="+", type=pathlib.Path, help="CSV or JSON Lines files"
+    )
+    args = parser.parse_args()
+
+    config = load_config()
+    db.configure(config.get("database"))
+
+    loop = asyncio.get_event_loop()
+    twitch_client = TwitchClient(config["producers"]["poller"]["client-id"])
+    for path in args.files:
+        created = loop.run_until_complete(
+            import_follows(twitch_client, read_follows(path))
+        )
+        log.info(f"Imported {created} new follows from `{path}`.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
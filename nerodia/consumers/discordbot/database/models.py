@@ -1,49 +1,86 @@
 """
-By default, the database file is
-created under the filename "nerodia.db"
-in the directory in which the application
-is run. If you wish to change this
-behaviour, export an environment
-variable named NERODIA_DB_PATH with
-the full path towards the desired
-database file location.
+Contains the database models used by the
+Discord Bot consumer. The database that is
+connected to is set up through the `database`
+configuration section, see `nerodia.database`.
+The engine is only created on first use through
+`get_engine`, so importing the models is cheap.
+
+Instead of sharing a single session, every unit
+of work should open its own short-lived session
+through `session_scope`, and read-only queries
+should use Core statements on a connection from
+the engine's pool, which avoids the overhead of
+the ORM identity map entirely.
 """
 
-import pathlib
-import os
-
-from sqlalchemy import BigInteger, Column, Integer, String
+import contextlib
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+)
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy.orm import Session as SessionType, sessionmaker
 
+from nerodia.database import create_engine_from_config
 
-CWD = pathlib.Path.cwd()
-DEFAULT_DB_PATH = CWD / "data" / "nerodia.db"
-DB_PATH = os.environ.get("NERODIA_DB_PATH", DEFAULT_DB_PATH)
 
 Base = declarative_base()
 Session = sessionmaker()
 
+_db_config: Optional[Dict[str, Any]] = None
+_engine: Optional[Engine] = None
+
+
+class Stream(Base):
+    """
+    The stream table, which
+    caches information about
+    followed Twitch users,
+    keyed by their Twitch user ID.
+    """
+
+    __tablename__ = "discordbot_stream"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=False)
+    login = Column(String(25), nullable=False, index=True)
+    profile_image_url = Column(String(255))
+    offline_image_url = Column(String(255))
+    updated_at = Column(DateTime, nullable=False)
+
 
 class Follow(Base):
     """
     The follow table, which
     associates a Discord Guild ID
-    with a stream name that it
-    is following.
+    with the Twitch user ID of a
+    stream that it is following.
     """
 
     __tablename__ = "discordbot_follow"
+    __table_args__ = (
+        Index(
+            "ix_discordbot_follow_guild_stream", "guild_id", "stream_id", unique=True
+        ),
+    )
 
     id = Column(Integer, primary_key=True)
     guild_id = Column(BigInteger, nullable=False)
-    follows = Column(String(30), nullable=False)
-
-    def __init__(self, follows: str, *, guild_id: int = None, sub_name: str = None):
-        self.follows = follows
-        self.guild_id = guild_id
-        self.sub_name = sub_name
+    stream_id = Column(
+        BigInteger,
+        ForeignKey("discordbot_stream.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
 
 
 class UpdateChannel(Base):
@@ -54,14 +91,107 @@ class UpdateChannel(Base):
     in which stream updates are
     posted. This can be set through
     the Discord Bot interface.
+    When delivering through webhooks,
+    it also holds the webhook that
+    was created in the channel.
     """
 
     __tablename__ = "discordbot_updatechannel"
 
     guild_id = Column(BigInteger, primary_key=True)
     channel_id = Column(BigInteger, primary_key=True)
+    webhook_id = Column(BigInteger)
+    webhook_token = Column(String(100))
+
+
+class OutboxEvent(Base):
+    """
+    The outbox table, which holds
+    stream announcements until they
+    were delivered, so that they
+    survive restarts and outages.
+    Only the latest pending event
+    of every stream is kept.
+    """
+
+    __tablename__ = "discordbot_outbox"
+
+    stream_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    event_id = Column(String(32), nullable=False)
+    name = Column(String(25), nullable=False)
+    # The serialized embed to send, as JSON.
+    payload = Column(Text, nullable=False)
+    # A JSON list of the channels left to deliver to, or `NULL` for all channels.
+    channel_ids = Column(Text)
+    attempts = Column(Integer, nullable=False)
+    next_attempt_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+
+@contextlib.contextmanager
+def session_scope() -> Iterator[SessionType]:
+    """Provide a session scoped to a single unit of work.
+
+    The session is committed if the block exits
+    normally and rolled back if it raises. In either
+    case, it is closed afterwards, which releases its
+    connection and all objects loaded through it.
+
+    Yields:
+        Session:
+            A new session bound to the database engine.
+    """
+
+    session = Session(bind=get_engine())
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def configure(db_config: Optional[Dict[str, Any]]):
+    """Set the configuration that the engine is created from on first use.
+
+    Args:
+        db_config (Optional[Dict[str, Any]]):
+            The `database` section of the configuration, if present.
+    """
+
+    global _db_config, _engine
+
+    _db_config = db_config
+    _engine = None
+
+
+def get_engine() -> Engine:
+    """Get the engine of the configured database, creating it on first use.
+
+    Returns:
+        Engine:
+            The engine that all database operations should use.
+            Without a configuration set through `configure`,
+            it is connected to the default SQLite database.
+    """
+
+    global _engine
+
+    if _engine is None:
+        _engine = create_engine_from_config(_db_config)
+    return _engine
+
+
+def bind(new_engine: Engine):
+    """Bind the models to the given engine instead of the configured one.
+
+    Args:
+        new_engine (Engine):
+            The engine that all subsequent database operations should use.
+    """
 
+    global _engine
 
-engine = create_engine(f"sqlite:///{DB_PATH}")
-Session.configure(bind=engine)
-session = Session()
+    _engine = new_engine
@@ -0,0 +1,87 @@
+"""
+Provides functions for storing
+pending stream announcements
+in the outbox table.
+"""
+
+from typing import Any, Dict, List
+
+from sqlalchemy import and_, bindparam
+
+from . import models as db
+from .common import chunked
+
+
+def get_all_events() -> List[Dict[str, Any]]:
+    """
+    Returns every pending event in the outbox.
+
+    Returns:
+        List[Dict[str, Any]]:
+            A list of outbox rows, ordered by their creation time.
+    """
+
+    table = db.OutboxEvent.__table__
+    query = table.select().order_by(table.c.created_at)
+
+    with db.get_engine().connect() as connection:
+        return [dict(row) for row in connection.execute(query)]
+
+
+def write_batch(
+    appended: List[Dict[str, Any]],
+    retried: List[Dict[str, Any]],
+    delivered: List[Dict[str, Any]],
+):
+    """
+    Writes a batch of changes to the outbox in a single transaction.
+
+    Rows are matched by both their stream ID and their event ID,
+    so that changes to an event which has since been replaced by
+    a newer event of the same stream do not affect the newer event.
+
+    Arguments:
+        appended (List[Dict[str, Any]]):
+            New outbox rows. They replace pending events of the same stream.
+        retried (List[Dict[str, Any]]):
+            Rows with the `stream_id` and `event_id` of events
+            that are retried, along with the updated `attempts`,
+            `next_attempt_at` and `channel_ids` columns.
+        delivered (List[Dict[str, Any]]):
+            Rows with the `stream_id` and `event_id`
+            of events that should be removed.
+    """
+
+    table = db.OutboxEvent.__table__
+    matches_event = and_(
+        table.c.stream_id == bindparam("b_stream_id"),
+        table.c.event_id == bindparam("b_event_id"),
+    )
+
+    with db.get_engine().begin() as connection:
+        if appended:
+            for stream_ids in chunked([row["stream_id"] for row in appended]):
+                connection.execute(
+                    table.delete().where(table.c.stream_id.in_(stream_ids))
+                )
+            connection.execute(table.insert(), appended)
+
+        if retried:
+            connection.execute(
+                table.update()
+                .where(matches_event)
+                .values(
+                    attempts=bindparam("b_attempts"),
+                    next_attempt_at=bindparam("b_next_attempt_at"),
+                    channel_ids=bindparam("b_channel_ids"),
+                ),
+                _bound(retried),
+            )
+
+        if delivered:
+            connection.execute(table.delete().where(matches_event), _bound(delivered))
+
+
+def _bound(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Bound parameter names must not clash with column names in `UPDATE` statements.
+    return [{f"b_{name}": value for name, value in row.items()} for row in rows]
@@ -1,3 +1,6 @@
+import functools
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
 import discord
 
 from nerodia.twitch import TwitchStream, TwitchUser
@@ -28,3 +31,76 @@ def create_stream_online_embed(stream: TwitchStream, user: TwitchUser) -> discor
     result.set_image(url=user.offline_image_url)
     result.set_thumbnail(url=user.profile_image_url)
     return result
+
+
+@functools.lru_cache(maxsize=256)
+def render_stream_online(stream: TwitchStream, user: TwitchUser) -> Dict[str, Any]:
+    """Renders the stream online embed into the payload sent to Discord.
+
+    Rendering is cached, so a stream event that is announced in many
+    channels only creates and serializes its embed once. Should the
+    embed ever be customised per guild, the customisation must become
+    part of the arguments, so that it remains part of the cache key.
+
+    Args:
+        stream (TwitchStream):
+            The stream for which the payload should be rendered.
+        user (TwitchUser):
+            The user that is streaming.
+
+    Returns:
+        Dict[str, Any]:
+            The serialized embed. It is shared between
+            all callers and must not be modified.
+    """
+
+    return create_stream_online_embed(stream, user).to_dict()
+
+
+def create_dashboard_embed(
+    guild: discord.Guild,
+    update_channel: str,
+    follows: List[Tuple[int, str]],
+    streams: Mapping[int, Optional[TwitchStream]],
+    page: int,
+    page_count: int,
+) -> discord.Embed:
+    """Formats a single page of the guild dashboard into an Embed.
+
+    Args:
+        guild (discord.Guild):
+            The guild whose dashboard is shown.
+        update_channel (str):
+            A description of the update channel of the guild.
+        follows (List[Tuple[int, str]]):
+            The `(stream_id, login)` pairs of the streams on this page.
+        streams (Mapping[int, Optional[TwitchStream]]):
+            The current stream of every followed user, as seen by the poller.
+        page (int):
+            The zero-based number of the page.
+        page_count (int):
+            The total amount of pages.
+
+    Returns:
+        discord.Embed:
+            The dashboard page, marking streams which are currently live.
+    """
+
+    lines = []
+    for stream_id, login in follows:
+        stream = streams.get(stream_id)
+        if stream is None:
+            lines.append(login)
+        else:
+            lines.append(f"\N{LARGE RED CIRCLE} **{login}**: *{stream.title[:80]}*")
+
+    result = discord.Embed(
+        title="Followed Streams",
+        description="\n".join(lines) or "No follows :(",
+        colour=discord.Colour.blue(),
+    )
+    result.set_author(name=f"Guild Dashboard for {guild.name}", icon_url=guild.icon_url)
+    result.add_field(name="Stream Update Channel", value=update_channel)
+    if page_count > 1:
+        result.set_footer(text=f"Page {page + 1} of {page_count}")
+    return result
@@ -0,0 +1,417 @@
+"""
+Contains the fan-out engine which delivers
+announcements to many Discord channels at once,
+partitioned by the shard of the receiving guild.
+"""
+
+import asyncio
+import collections
+import logging
+from typing import (
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+import aiohttp
+import discord
+
+from nerodia.metrics import REGISTRY, percentile
+
+
+log = logging.getLogger(__name__)
+
+# How often a send is attempted while being rate limited before giving up.
+MAX_ATTEMPTS = 5
+
+# The outcomes of delivering an announcement to a single channel.
+DELIVERED = "delivered"
+FAILED = "failed"
+# The delivery failed for a reason that may go away, such as Discord being
+# unreachable, so that delivering again later may succeed.
+RETRYABLE = "retryable"
+
+DELIVERY_SECONDS = REGISTRY.histogram(
+    "nerodia_discord_delivery_seconds",
+    "Seconds from queueing an announcement to its delivery to a channel.",
+)
+DELIVERIES = REGISTRY.counter(
+    "nerodia_discord_deliveries_total",
+    "Deliveries of announcements to channels, by outcome.",
+    ["outcome"],
+)
+_deliveries_by_outcome = {
+    outcome: DELIVERIES.labels(outcome) for outcome in (DELIVERED, FAILED, RETRYABLE)
+}
+RATE_LIMITED = REGISTRY.counter(
+    "nerodia_discord_rate_limited_total",
+    "Sends that were rate limited by Discord, by scope.",
+    ["scope"],
+)
+RATE_LIMITED_GLOBAL = RATE_LIMITED.labels("global")
+RATE_LIMITED_BUCKET = RATE_LIMITED.labels("bucket")
+
+
+class Announcement:
+    """Tracks the delivery of a single announcement to all of its channels."""
+
+    def __init__(self, name: str, channel_count: int, loop: asyncio.AbstractEventLoop):
+        self.name = name
+        self.started_at = loop.time()
+        self.latencies: List[float] = []
+        self.failures = 0
+        self.retryable: List[int] = []
+        self._remaining = channel_count
+        self._done = loop.create_future()
+
+        if not channel_count:
+            self._done.set_result(None)
+
+    @property
+    def done(self) -> bool:
+        return self._done.done()
+
+    def add_done_callback(self, callback: Callable[["Announcement"], None]):
+        """Call the given callback with this announcement once it was delivered."""
+
+        self._done.add_done_callback(lambda _: callback(self))
+
+    async def wait(self):
+        """Wait until delivery to every channel finished, successfully or not."""
+
+        await asyncio.shield(self._done)
+
+    def _complete_channel(self, channel_id: int, latency: float, outcome: str):
+        self.latencies.append(latency)
+        self.failures += outcome != DELIVERED
+        if outcome == RETRYABLE:
+            self.retryable.append(channel_id)
+        self._remaining -= 1
+        if not self._remaining:
+            self._done.set_result(None)
+
+
+class RateLimiter:
+    """Keeps track of Discord rate limits for all senders.
+
+    Once Discord responds with `429 Too Many Requests`, sends to the
+    rate limited bucket - or all sends, for the global rate limit - are
+    paused until the rate limit resets. The message creation bucket is
+    per channel, which is why the channel ID is used as the bucket key.
+
+    This mainly serves webhook sends, which bypass discord.py. Sends
+    through the bot are already retried on 429 by discord.py's HTTP
+    client, so they only reach this once discord.py gives up retrying.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._bucket_resets: Dict[int, float] = {}
+        self._global_reset = 0.0
+
+    async def wait(self, bucket: int):
+        """Wait until neither the given bucket nor the global rate limit applies."""
+
+        reset = max(self._global_reset, self._bucket_resets.get(bucket, 0.0))
+        delay = reset - self._loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._bucket_resets.pop(bucket, None)
+
+    def observe(self, bucket: int, headers: Mapping[str, str]):
+        """Pause the bucket until it resets if the given response headers
+        report that no requests remain, to avoid running into a 429."""
+
+        if headers.get("X-RateLimit-Remaining") == "0":
+            reset_after = float(headers.get("X-RateLimit-Reset-After", 1))
+            self._bucket_resets[bucket] = self._loop.time() + reset_after
+
+    def handle(self, bucket: int, error: discord.HTTPException):
+        """Pause the bucket or all buckets according to the given 429 response."""
+
+        headers = getattr(error.response, "headers", {})
+        retry_after = float(headers.get("Retry-After", 1))
+        reset = self._loop.time() + retry_after
+
+        if headers.get("X-RateLimit-Global", "").lower() == "true":
+            RATE_LIMITED_GLOBAL.inc()
+            log.warning(f"Hit the global rate limit, pausing for {retry_after}s.")
+            self._global_reset = max(self._global_reset, reset)
+        else:
+            RATE_LIMITED_BUCKET.inc()
+            self._bucket_resets[bucket] = reset
+
+
+class FanOut:
+    """Sends announcements to many channels concurrently.
+
+    Every channel has its own queue which is drained by a worker
+    that is started on demand, so that sends to a single channel
+    stay ordered while different channels are served concurrently.
+    The total amount of sends in flight is capped by a semaphore.
+    Sends which were rate limited are retried once the rate limit resets.
+    Channels which could not be reached are recorded on the announcement
+    as retryable, so that the caller can try delivering to them again.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        semaphore: asyncio.Semaphore,
+        rate_limiter: RateLimiter,
+        ready: Optional[asyncio.Event] = None,
+    ):
+        """Create a new fan-out engine.
+
+        Args:
+            loop (asyncio.AbstractEventLoop):
+                The event loop to run the channel workers on.
+            semaphore (asyncio.Semaphore):
+                Caps the amount of sends in flight. May be shared.
+            rate_limiter (RateLimiter):
+                Tracks rate limits. Should be shared by every sender.
+            ready (Optional[asyncio.Event]):
+                If given, sends are held back while the event is not set.
+        """
+
+        self._loop = loop
+        self._semaphore = semaphore
+        self._rate_limiter = rate_limiter
+        self._ready = ready
+        self._queues: Dict[int, Deque[Tuple[Announcement, Callable]]] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+
+    @property
+    def pending(self) -> int:
+        """The amount of sends that are queued or in flight."""
+
+        return sum(len(queue) for queue in self._queues.values()) + len(self._workers)
+
+    def announce(
+        self,
+        announcement: Announcement,
+        channel_ids: Iterable[int],
+        send: Callable[[int], Awaitable[None]],
+    ):
+        """Queue an announcement for delivery to the given channels.
+
+        Args:
+            announcement (Announcement):
+                Tracks the delivery of the announcement.
+            channel_ids (Iterable[int]):
+                The IDs of the channels to deliver the announcement to.
+            send (Callable[[int], Awaitable[None]]):
+                A coroutine function which sends the announcement
+                to the channel with the given ID.
+        """
+
+        for channel_id in channel_ids:
+            queue = self._queues.get(channel_id)
+            if queue is None:
+                queue = self._queues[channel_id] = collections.deque()
+                self._workers[channel_id] = self._loop.create_task(
+                    self._drain(channel_id, queue)
+                )
+            queue.append((announcement, send))
+
+    async def close(self):
+        """Cancel all pending deliveries."""
+
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+        self._queues.clear()
+
+    async def _drain(self, channel_id: int, queue: Deque):
+        try:
+            while queue:
+                announcement, send = queue.popleft()
+                outcome = await self._deliver(channel_id, send)
+                latency = self._loop.time() - announcement.started_at
+                DELIVERY_SECONDS.observe(latency)
+                _deliveries_by_outcome[outcome].inc()
+                announcement._complete_channel(channel_id, latency, outcome)
+        finally:
+            del self._queues[channel_id]
+            del self._workers[channel_id]
+
+    async def _deliver(self, channel_id: int, send: Callable) -> str:
+        for _ in range(MAX_ATTEMPTS):
+            if self._ready is not None:
+                await self._ready.wait()
+            await self._rate_limiter.wait(channel_id)
+
+            async with self._semaphore:
+                try:
+                    await send(channel_id)
+                    return DELIVERED
+                except discord.HTTPException as e:
+                    if e.status != 429:
+                        log.warning(f"Failed to send to channel {channel_id}: {e}")
+                        return RETRYABLE if e.status >= 500 else FAILED
+                    self._rate_limiter.handle(channel_id, e)
+                except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                    log.warning(f"Could not reach channel {channel_id}: {e}")
+                    return RETRYABLE
+                except Exception:
+                    log.exception(f"Unexpected error sending to channel {channel_id}.")
+                    return FAILED
+
+        log.warning(
+            f"Giving up on sending to channel {channel_id} "
+            f"after being rate limited {MAX_ATTEMPTS} times."
+        )
+        return RETRYABLE
+
+
+class ShardedFanOut:
+    """Partitions announcement delivery by the shard of the receiving guild.
+
+    Every shard gets its own delivery worker in the form of a `FanOut`,
+    which only holds the channels of guilds on that shard. Delivery
+    for a shard is held back while it is not connected, so that a slow
+    or reconnecting shard does not delay announcements on healthy shards.
+    The concurrency cap and the rate limits are shared by all shards,
+    since they apply to the bot as a whole.
+
+    When the bot only runs a range of shards, for example when shards
+    are split across processes, channels of guilds on other shards
+    are skipped, as they are delivered by the process owning the shard.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        max_concurrency: int = 50,
+        shard_count: Optional[int] = None,
+        shard_ids: Optional[Iterable[int]] = None,
+        wait_for_shards: bool = True,
+    ):
+        """Create a new sharded fan-out engine.
+
+        Args:
+            loop (asyncio.AbstractEventLoop):
+                The event loop to run the channel workers on.
+            max_concurrency (int):
+                The maximum amount of sends in flight across all shards.
+            shard_count (Optional[int]):
+                The total amount of shards. Can be updated
+                later through `shard_count` once it is known.
+            shard_ids (Optional[Iterable[int]]):
+                The shards handled by this process, or `None` for all shards.
+            wait_for_shards (bool):
+                Whether delivery for a shard is held back while it is
+                not connected. Delivery that does not go through the bot,
+                such as through webhooks, does not need to wait.
+        """
+
+        self.shard_count = shard_count
+        self._loop = loop
+        self._shard_ids = None if shard_ids is None else frozenset(shard_ids)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.rate_limiter = RateLimiter(loop)
+        self._wait_for_shards = wait_for_shards
+        self._ready: Dict[int, asyncio.Event] = {}
+        self._fanouts: Dict[int, FanOut] = {}
+
+    def shard_for(self, guild_id: int) -> int:
+        """Get the ID of the shard which the given guild is on."""
+
+        return (guild_id >> 22) % (self.shard_count or 1)
+
+    def is_local(self, guild_id: int) -> bool:
+        """Check whether the given guild is on a shard handled by this process."""
+
+        return self._shard_ids is None or self.shard_for(guild_id) in self._shard_ids
+
+    def set_ready(self, shard_id: int, ready: bool):
+        """Resume or hold back delivery for the given shard."""
+
+        event = self._ready_event(shard_id)
+        if ready:
+            event.set()
+        else:
+            event.clear()
+
+    def announce(
+        self,
+        name: str,
+        targets: Iterable[Tuple[int, int]],
+        send: Callable[[int], Awaitable[None]],
+    ) -> Announcement:
+        """Queue an announcement for delivery to the given channels.
+
+        Args:
+            name (str):
+                A name describing the announcement, used for logging.
+            targets (Iterable[Tuple[int, int]]):
+                `(guild_id, channel_id)` pairs of the channels
+                to deliver the announcement to.
+            send (Callable[[int], Awaitable[None]]):
+                A coroutine function which sends the announcement
+                to the channel with the given ID.
+
+        Returns:
+            Announcement:
+                Tracks the delivery of the announcement. Delivery happens
+                in the background, await `Announcement.wait` to wait for it.
+        """
+
+        by_shard: Dict[int, List[int]] = {}
+        for guild_id, channel_id in targets:
+            if self.is_local(guild_id):
+                by_shard.setdefault(self.shard_for(guild_id), []).append(channel_id)
+
+        announcement = Announcement(
+            name, sum(len(ids) for ids in by_shard.values()), self._loop
+        )
+        announcement.add_done_callback(self._log_latency)
+
+        for shard_id, channel_ids in by_shard.items():
+            fanout = self._fanouts.get(shard_id)
+            if fanout is None:
+                fanout = self._fanouts[shard_id] = FanOut(
+                    self._loop,
+                    self._semaphore,
+                    self.rate_limiter,
+                    self._ready_event(shard_id) if self._wait_for_shards else None,
+                )
+            fanout.announce(announcement, channel_ids, send)
+
+        return announcement
+
+    def pending(self) -> Dict[int, int]:
+        """Get the amount of queued or in-flight sends per shard."""
+
+        return {shard_id: fanout.pending for shard_id, fanout in self._fanouts.items()}
+
+    async def close(self):
+        """Cancel all pending deliveries on all shards."""
+
+        await asyncio.gather(*(fanout.close() for fanout in self._fanouts.values()))
+        self._fanouts.clear()
+
+    def _ready_event(self, shard_id: int) -> asyncio.Event:
+        event = self._ready.get(shard_id)
+        if event is None:
+            event = self._ready[shard_id] = asyncio.Event()
+        return event
+
+    @staticmethod
+    def _log_latency(announcement: Announcement):
+        if not announcement.latencies:
+            return
+
+        log.info(
+            f"Announced {announcement.name} to {len(announcement.latencies)} "
+            f"channels ({announcement.failures} failed): "
+            f"p50 {percentile(announcement.latencies, 0.5):.3f}s, "
+            f"p99 {percentile(announcement.latencies, 0.99):.3f}s."
+        )
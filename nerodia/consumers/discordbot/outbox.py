@@ -0,0 +1,255 @@
+"""
+Contains the outbox, which stores stream announcements
+in the database until they were delivered, so that
+they survive restarts and outages of Discord.
+"""
+
+import asyncio
+import datetime
+import json
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, NamedTuple, Optional
+
+from .database import outbox as outbox_db
+from .fanout import Announcement
+
+
+log = logging.getLogger(__name__)
+
+# The delay before the first retry, which doubles with every further attempt.
+RETRY_BASE_DELAY = 5.0
+RETRY_MAX_DELAY = 600.0
+
+
+class OutboxEvent(NamedTuple):
+    stream_id: int
+    event_id: str
+    name: str
+    payload: Dict[str, Any]
+    # The channels left to deliver to, or `None` for all channels.
+    channel_ids: Optional[FrozenSet[int]]
+    attempts: int
+
+
+class Outbox:
+    """Delivers stream announcements at least once.
+
+    Appended events are written to the outbox table in batches, and
+    only delivered once they were stored. Events are removed from the
+    table after delivery, and delivery to channels that could not be
+    reached is retried with exponential backoff. Only the latest event
+    of every stream is kept, as it supersedes any older event. Events
+    left over from a previous run are delivered again on startup.
+
+    Since appends are batched, an event that was appended during the
+    last `batch_interval` seconds before a crash can still be lost.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        deliver: Callable[[OutboxEvent], Awaitable[Announcement]],
+        max_attempts: int = 10,
+        batch_interval: float = 0.05,
+    ):
+        """Create a new outbox.
+
+        Args:
+            loop (asyncio.AbstractEventLoop):
+                The event loop to run deliveries on.
+            deliver (Callable[[OutboxEvent], Awaitable[Announcement]]):
+                A coroutine function which queues the given event
+                for delivery and returns its announcement.
+            max_attempts (int):
+                How often delivery of an event is attempted before giving up.
+            batch_interval (float):
+                How many seconds to collect changes for before writing them.
+        """
+
+        self._loop = loop
+        self._deliver = deliver
+        self._max_attempts = max_attempts
+        self._batch_interval = batch_interval
+        self._appended: Dict[int, OutboxEvent] = {}
+        self._retried: List[Dict[str, Any]] = []
+        self._delivered: List[Dict[str, Any]] = []
+        # Maps stream IDs to the ID of their latest stored event.
+        self._latest: Dict[int, str] = {}
+        self._wakeup = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._deliveries = set()
+        self._timers = set()
+
+    def start(self):
+        """Start writing appended events and replay events of a previous run."""
+
+        now = datetime.datetime.utcnow()
+        rows = outbox_db.get_all_events()
+        for row in rows:
+            event = OutboxEvent(
+                row["stream_id"],
+                row["event_id"],
+                row["name"],
+                json.loads(row["payload"]),
+                None
+                if row["channel_ids"] is None
+                else frozenset(json.loads(row["channel_ids"])),
+                row["attempts"],
+            )
+            self._latest[event.stream_id] = event.event_id
+            delay = (row["next_attempt_at"] - now).total_seconds()
+            self._schedule(event, max(0, delay))
+
+        if rows:
+            log.info(f"Replaying {len(rows)} undelivered announcements.")
+        self._writer = self._loop.create_task(self._write_batches())
+
+    def append(self, stream_id: int, name: str, payload: Dict[str, Any]):
+        """Append an announcement to the outbox.
+
+        Args:
+            stream_id (int):
+                The Twitch user ID of the stream the announcement is about.
+            name (str):
+                The name of the stream, used for logging.
+            payload (Dict[str, Any]):
+                The serialized embed to announce.
+        """
+
+        event = OutboxEvent(stream_id, uuid.uuid4().hex, name, payload, None, 0)
+        self._appended[stream_id] = event
+        self._wakeup.set()
+
+    async def close(self):
+        """Write pending changes and stop delivering."""
+
+        if self._writer is not None:
+            self._writer.cancel()
+            await asyncio.gather(self._writer, return_exceptions=True)
+            self._writer = None
+
+        for timer in self._timers:
+            timer.cancel()
+        for delivery in self._deliveries:
+            delivery.cancel()
+        await asyncio.gather(*self._deliveries, return_exceptions=True)
+        self._timers.clear()
+
+        # Appended events were not delivered yet, they are replayed on startup.
+        try:
+            self._write()
+        except Exception:
+            log.exception("Failed to write to the outbox while closing it.")
+
+    async def _write_batches(self):
+        while True:
+            await self._wakeup.wait()
+            await asyncio.sleep(self._batch_interval)
+            self._wakeup.clear()
+
+            try:
+                appended = self._write()
+            except Exception:
+                log.exception("Failed to write to the outbox, retrying shortly.")
+                self._wakeup.set()
+                await asyncio.sleep(1)
+            else:
+                for event in appended:
+                    self._schedule(event, 0)
+
+    def _write(self) -> List[OutboxEvent]:
+        appended = list(self._appended.values())
+        retried, delivered = self._retried, self._delivered
+        if not (appended or retried or delivered):
+            return appended
+
+        now = datetime.datetime.utcnow()
+        outbox_db.write_batch(
+            [
+                {
+                    "stream_id": event.stream_id,
+                    "event_id": event.event_id,
+                    "name": event.name,
+                    "payload": json.dumps(event.payload),
+                    "channel_ids": None,
+                    "attempts": 0,
+                    "next_attempt_at": now,
+                    "created_at": now,
+                }
+                for event in appended
+            ],
+            retried,
+            delivered,
+        )
+
+        # Only forget changes once they were written, so that they are retried.
+        for event in appended:
+            self._latest[event.stream_id] = event.event_id
+            if self._appended.get(event.stream_id) is event:
+                del self._appended[event.stream_id]
+        self._retried, self._delivered = [], []
+        return appended
+
+    def _schedule(self, event: OutboxEvent, delay: float):
+        def start_delivery():
+            self._timers.discard(timer)
+            # Drop retries of events that were superseded by a newer event.
+            if self._latest.get(event.stream_id) != event.event_id:
+                return
+
+            delivery = self._loop.create_task(self._run(event))
+            self._deliveries.add(delivery)
+            delivery.add_done_callback(self._deliveries.discard)
+
+        timer = self._loop.call_later(delay, start_delivery)
+        self._timers.add(timer)
+
+    async def _run(self, event: OutboxEvent):
+        try:
+            announcement = await self._deliver(event)
+            await announcement.wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception(f"Failed to deliver the announcement for {event.name}.")
+            self._retry(event, event.channel_ids)
+        else:
+            if announcement.retryable:
+                self._retry(event, frozenset(announcement.retryable))
+            else:
+                self._remove(event)
+        self._wakeup.set()
+
+    def _retry(self, event: OutboxEvent, channel_ids: Optional[FrozenSet[int]]):
+        attempts = event.attempts + 1
+        if attempts >= self._max_attempts:
+            log.warning(
+                f"Giving up on announcing {event.name} after {attempts} attempts."
+            )
+            self._remove(event)
+            return
+
+        delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** event.attempts)
+        self._retried.append(
+            {
+                "stream_id": event.stream_id,
+                "event_id": event.event_id,
+                "attempts": attempts,
+                "next_attempt_at": datetime.datetime.utcnow()
+                + datetime.timedelta(seconds=delay),
+                "channel_ids": None
+                if channel_ids is None
+                else json.dumps(sorted(channel_ids)),
+            }
+        )
+        log.info(f"Retrying announcement of {event.name} in {delay:.0f}s.")
+        retry = event._replace(channel_ids=channel_ids, attempts=attempts)
+        self._schedule(retry, delay)
+
+    def _remove(self, event: OutboxEvent):
+        if self._latest.get(event.stream_id) == event.event_id:
+            del self._latest[event.stream_id]
+        self._delivered.append(
+            {"stream_id": event.stream_id, "event_id": event.event_id}
+        )
@@ -0,0 +1,203 @@
+"""
+Contains the in-memory routing table
+which maps followed streams to the
+channels their updates are posted in.
+"""
+
+import logging
+import sys
+from typing import Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+from .database import guilds as guild_db
+
+
+log = logging.getLogger(__name__)
+
+
+class RoutingTable:
+    """A materialized index of Twitch user ID -> update channels.
+
+    Follows and update channels change rarely compared to how often
+    stream updates need to be routed, so the table is loaded from the
+    database once and kept consistent by writing through every change
+    made by the `follow`, `unfollow` and `setchannel` commands.
+    """
+
+    def __init__(self):
+        self._follows: Dict[int, Set[int]] = {}
+        self._followers: Dict[int, Set[int]] = {}
+        self._channels: Dict[int, int] = {}
+        self._webhooks: Dict[int, Tuple[int, str]] = {}
+        # The logins of followed streams as stored in the database,
+        # so that renames can be detected without querying it.
+        self._logins: Dict[int, str] = {}
+        self._routes: Dict[int, FrozenSet[Tuple[int, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    def load(self):
+        """(Re)load the routing table from the database."""
+
+        self._follows = {}
+        self._followers = {}
+        for guild_id, stream_id in guild_db.get_all_guild_follows():
+            self._follows.setdefault(guild_id, set()).add(stream_id)
+            self._followers.setdefault(stream_id, set()).add(guild_id)
+        self._channels = guild_db.get_all_update_channels()
+        self._webhooks = guild_db.get_all_webhooks()
+        self._logins = guild_db.get_all_followed_logins()
+
+        self._routes = {}
+        self._rebuild_routes(self._followers)
+
+        log.info(
+            f"Loaded routing table with {len(self)} routes "
+            f"using {self.memory_usage()} bytes."
+        )
+
+    def channels_for(self, stream_id: int) -> FrozenSet[Tuple[int, int]]:
+        """Get the update channels that are interested in the given stream.
+
+        Args:
+            stream_id (int):
+                The Twitch user ID of the stream for
+                which update channels should be returned.
+
+        Returns:
+            FrozenSet[Tuple[int, int]]:
+                `(guild_id, channel_id)` pairs of the update channels of
+                all guilds following the stream. The returned set is never
+                modified, so it is safe to iterate over it while the routing
+                table is being updated.
+        """
+
+        return self._routes.get(stream_id, frozenset())
+
+    def followers_of(self, stream_id: int) -> FrozenSet[int]:
+        """Get the IDs of the guilds following the given stream."""
+
+        return frozenset(self._followers.get(stream_id, ()))
+
+    def login_of(self, stream_id: int) -> Optional[str]:
+        """Get the stored login of the given stream, if known."""
+
+        return self._logins.get(stream_id)
+
+    def set_login(self, stream_id: int, login: str):
+        """Remember the login of the given stream after storing it."""
+
+        self._logins[stream_id] = login
+
+    def channel_of(self, guild_id: int) -> Optional[int]:
+        """Get the ID of the update channel of the given guild, if set."""
+
+        return self._channels.get(guild_id)
+
+    def webhook_for(self, channel_id: int) -> Optional[Tuple[int, str]]:
+        """Get the `(webhook_id, webhook_token)` of the given channel, if any."""
+
+        return self._webhooks.get(channel_id)
+
+    def follow(self, guild_id: int, *stream_ids: int):
+        """Add the given streams to the follows of the given guild."""
+
+        self._follows.setdefault(guild_id, set()).update(stream_ids)
+        for stream_id in stream_ids:
+            self._followers.setdefault(stream_id, set()).add(guild_id)
+        self._rebuild_routes(stream_ids)
+
+    def unfollow(self, guild_id: int, *stream_ids: int):
+        """Remove the given streams from the follows of the given guild."""
+
+        follows = self._follows.get(guild_id)
+        if follows is not None:
+            follows.difference_update(stream_ids)
+            if not follows:
+                del self._follows[guild_id]
+        for stream_id in stream_ids:
+            followers = self._followers.get(stream_id)
+            if followers is not None:
+                followers.discard(guild_id)
+                if not followers:
+                    del self._followers[stream_id]
+        self._rebuild_routes(stream_ids)
+
+    def set_channel(
+        self,
+        guild_id: int,
+        channel_id: int,
+        webhook: Optional[Tuple[int, str]] = None,
+    ):
+        """Set the update channel of the given guild, along with its webhook."""
+
+        previous = self._channels.get(guild_id)
+        if previous is not None:
+            self._webhooks.pop(previous, None)
+        self._channels[guild_id] = channel_id
+        if webhook is not None:
+            self._webhooks[channel_id] = webhook
+        self._rebuild_routes(self._follows.get(guild_id, ()))
+
+    def clear_webhook(self, channel_id: int):
+        """Remove the webhook of the given channel, leaving the channel set."""
+
+        self._webhooks.pop(channel_id, None)
+
+    def unset_channel(self, guild_id: int):
+        """Remove the update channel of the given guild."""
+
+        channel_id = self._channels.pop(guild_id, None)
+        if channel_id is not None:
+            self._webhooks.pop(channel_id, None)
+        self._rebuild_routes(self._follows.get(guild_id, ()))
+
+    def memory_usage(self) -> int:
+        """Approximate the memory used by the routing table, in bytes.
+
+        Returns:
+            int:
+                The summed size of the underlying containers
+                along with the keys and values stored in them.
+        """
+
+        total = sys.getsizeof(self._follows) + sys.getsizeof(self._followers)
+        total += sys.getsizeof(self._channels) + sys.getsizeof(self._routes)
+        total += sys.getsizeof(self._webhooks) + sys.getsizeof(self._logins)
+
+        for guild_id, stream_ids in self._follows.items():
+            total += sys.getsizeof(guild_id) + sys.getsizeof(stream_ids)
+            total += sum(sys.getsizeof(stream_id) for stream_id in stream_ids)
+        for stream_id, guild_ids in self._followers.items():
+            total += sys.getsizeof(stream_id) + sys.getsizeof(guild_ids)
+            total += sum(sys.getsizeof(guild_id) for guild_id in guild_ids)
+        for guild_id, channel_id in self._channels.items():
+            total += sys.getsizeof(guild_id) + sys.getsizeof(channel_id)
+        for channel_id, webhook in self._webhooks.items():
+            total += sys.getsizeof(channel_id) + sys.getsizeof(webhook)
+            total += sum(sys.getsizeof(value) for value in webhook)
+        for stream_id, login in self._logins.items():
+            total += sys.getsizeof(stream_id) + sys.getsizeof(login)
+        for stream_id, targets in self._routes.items():
+            total += sys.getsizeof(stream_id) + sys.getsizeof(targets)
+            total += sum(
+                sys.getsizeof(target) + sys.getsizeof(target[1]) for target in targets
+            )
+
+        return total
+
+    def _rebuild_routes(self, stream_ids: Iterable[int]):
+        for stream_id in set(stream_ids):
+            self._rebuild_route(stream_id)
+
+    def _rebuild_route(self, stream_id: int):
+        targets = frozenset(
+            (guild_id, self._channels[guild_id])
+            for guild_id in self._followers.get(stream_id, ())
+            if guild_id in self._channels
+        )
+
+        if targets:
+            self._routes[stream_id] = targets
+        else:
+            self._routes.pop(stream_id, None)
@@ -0,0 +1,90 @@
+"""
+Contains the client used to deliver
+announcements through channel webhooks,
+which keeps the bot account out of the
+delivery of announcements entirely.
+"""
+
+from typing import Any, Dict, Mapping, Optional
+
+import aiohttp
+import discord
+
+DEFAULT_BASE_URL = "https://discordapp.com/api/v6"
+
+
+class WebhookClient:
+    """Executes Discord webhooks through a pooled HTTP session.
+
+    Executing a webhook only requires its ID and token, not the bot
+    token, and every webhook has its own rate limit. The session is
+    created on first use and reuses connections between requests.
+    """
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, max_connections: int = 100):
+        """Create a new webhook client.
+
+        Args:
+            base_url (str):
+                The base URL of the Discord API. Can be pointed
+                at a local stand-in of the API for testing.
+            max_connections (int):
+                The maximum amount of connections to keep open.
+        """
+
+        self._base_url = base_url.rstrip("/")
+        self._max_connections = max_connections
+        self._cs: Optional[aiohttp.ClientSession] = None
+
+    async def execute(
+        self, webhook_id: int, token: str, embed: Dict[str, Any]
+    ) -> Mapping[str, str]:
+        """Post the given embed through the given webhook.
+
+        Args:
+            webhook_id (int):
+                The ID of the webhook to execute.
+            token (str):
+                The token of the webhook.
+            embed (Dict[str, Any]):
+                The serialized embed to post.
+
+        Returns:
+            Mapping[str, str]:
+                The response headers, which describe the rate limit
+                of the webhook.
+
+        Raises:
+            discord.HTTPException:
+                Discord responded with an error status,
+                for example because the webhook was deleted
+                or the rate limit of the webhook was exceeded.
+        """
+
+        url = f"{self._base_url}/webhooks/{webhook_id}/{token}"
+        async with self._session().post(url, json={"embeds": [embed]}) as resp:
+            if resp.status >= 300:
+                raise discord.HTTPException(resp, await resp.text())
+            return resp.headers
+
+    async def delete(self, webhook_id: int, token: str):
+        """Delete the given webhook, ignoring webhooks that no longer exist."""
+
+        url = f"{self._base_url}/webhooks/{webhook_id}/{token}"
+        async with self._session().delete(url) as resp:
+            if resp.status >= 300 and resp.status != 404:
+                raise discord.HTTPException(resp, await resp.text())
+
+    async def close(self):
+        """Close the underlying HTTP session."""
+
+        if self._cs is not None:
+            await self._cs.close()
+            self._cs = None
+
+    def _session(self) -> aiohttp.ClientSession:
+        if self._cs is None:
+            self._cs = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._max_connections)
+            )
+        return self._cs
@@ -1,10 +1,16 @@
 import asyncio
 import logging
 import importlib
+from typing import Awaitable, Dict
+
+from . import metrics
 
 
 log = logging.getLogger(__name__)
 
+# Seconds that a single consumer or module may take to start up or to shut down.
+DEFAULT_TIMEOUTS = {"startup": 60, "shutdown": 30}
+
 
 class Nerodia:
 
@@ -13,6 +19,9 @@ class Nerodia:
         self.consumers = set()
         self.loop = loop
         self.modules = set()
+        # The current stream of every followed user, or `None` for offline users,
+        # keyed by Twitch user ID. Kept up to date by the stream poller.
+        self.streams = {}
 
     async def cleanup_consumer(self, consumer_name: str):
         """Cleans up the specified consumer and removes it from nerodia."""
@@ -29,16 +38,82 @@ class Nerodia:
         self.consumers.remove(consumer)
         log.info(f"Cleaned up consumer `{consumer.__class__.__name__}`.")
 
-    async def cleanup_all_consumers(self):
-        """Clean up any running consumers, and remove them from nerodia."""
+    async def cleanup_all_consumers(self, timeout: float = None):
+        """Clean up any running consumers concurrently, and remove them from nerodia.
 
-        for consumer in self.consumers:
-            await consumer.cleanup()
-            log.info(f"Cleaned up consumer `{consumer.__class__.__name__}`.")
+        Args:
+            timeout (float):
+                Seconds after which cleaning up a single consumer is abandoned,
+                or `None` to wait for every consumer to finish cleaning up.
+        """
+
+        await self.run_concurrently(
+            "Cleaning up consumers",
+            {consumer.name: self._cleanup(consumer) for consumer in self.consumers},
+            timeout,
+        )
 
         # Clean the internal consumer set
         self.consumers = set()
 
+    @staticmethod
+    async def _cleanup(consumer):
+        await consumer.cleanup()
+        log.info(f"Cleaned up consumer `{consumer.__class__.__name__}`.")
+
+    async def run_concurrently(
+        self,
+        phase: str,
+        components: Dict[str, Awaitable],
+        timeout: float = None,
+        raise_errors: bool = False,
+    ):
+        """Run the given coroutines concurrently and log how long they took.
+
+        Used for starting up and shutting down components which do not
+        depend on each other, so that a phase takes as long as its slowest
+        component instead of the sum of all components.
+
+        Args:
+            phase (str):
+                A description of what the coroutines do, used for logging.
+            components (Dict[str, Awaitable]):
+                Maps the name of every component to the coroutine to run for it.
+            timeout (float):
+                Seconds after which a single coroutine is cancelled,
+                or `None` to wait for every coroutine to finish.
+            raise_errors (bool):
+                Whether to raise the first error once all coroutines finished.
+                Otherwise, errors are only logged.
+        """
+
+        phase_start = self.loop.time()
+
+        async def run_component(name: str, coroutine: Awaitable):
+            start = self.loop.time()
+            try:
+                await asyncio.wait_for(coroutine, timeout)
+            except asyncio.TimeoutError:
+                log.error(f"{phase}: `{name}` timed out after {timeout}s.")
+                raise
+            except Exception:
+                log.exception(f"{phase}: `{name}` failed.")
+                raise
+            log.info(f"{phase}: `{name}` took {self.loop.time() - start:.2f}s.")
+
+        results = await asyncio.gather(
+            *(run_component(name, coro) for name, coro in components.items()),
+            return_exceptions=True,
+        )
+        log.info(
+            f"{phase}: finished {len(components)} components "
+            f"in {self.loop.time() - phase_start:.2f}s."
+        )
+
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors and raise_errors:
+            raise errors[0]
+
     async def initialize_consumer(self, twitch_client, consumer_name: str):
         """Import, initialize and add consumer to nerodia."""
 
@@ -114,25 +189,65 @@ class Nerodia:
 
     def run(self, twitch_client, stream_poller):
         enabled_consumers = self.config["consumers"]["enabled"]
-        enabled_modules = self.config["modules"]["enabled"]
-
-        log.info("Loading consumers...")
-        for consumer in enabled_consumers:
-            self.loop.run_until_complete(
-                self.initialize_consumer(twitch_client, consumer)
+        enabled_modules = self.config["modules"]["enabled"] or []
+        timeouts = {**DEFAULT_TIMEOUTS, **self.config.get("timeouts", {})}
+
+        # Consumers are independent of each other, and modules only depend
+        # on their consumer, so every phase is run concurrently.
+        self.loop.run_until_complete(
+            self.run_concurrently(
+                "Loading consumers",
+                {
+                    consumer: self.initialize_consumer(twitch_client, consumer)
+                    for consumer in enabled_consumers
+                },
+                timeouts["startup"],
+                raise_errors=True,
+            )
+        )
+        self.loop.run_until_complete(
+            self.run_concurrently(
+                "Loading modules",
+                {
+                    module_path: self.load_module(module_path)
+                    for module_path in enabled_modules
+                },
+                timeouts["startup"],
+                raise_errors=True,
+            )
+        )
+
+        metrics_config = self.config.get("metrics") or {}
+        metrics_server = None
+        if metrics_config.get("enabled"):
+            metrics_server = self.loop.run_until_complete(
+                metrics.start_http_server(
+                    metrics_config.get("host", "127.0.0.1"),
+                    metrics_config.get("port", 9150),
+                )
             )
-
-        log.info("Loading modules...")
-        for module_path in enabled_modules:
-            self.loop.run_until_complete(self.load_module(module_path))
 
         try:
-            self.loop.run_until_complete(stream_poller(self.consumers, twitch_client))
+            self.loop.run_until_complete(
+                stream_poller(self.consumers, twitch_client, self.streams)
+            )
         except KeyboardInterrupt:
             log.info("Got SIGINT. Shutting down...")
 
-        for module in self.modules:
-            self.loop.run_until_complete(self.unload_module(module.name, remove_from_set=False))
+        if metrics_server is not None:
+            metrics_server.close()
+            self.loop.run_until_complete(metrics_server.wait_closed())
+
+        self.loop.run_until_complete(
+            self.run_concurrently(
+                "Unloading modules",
+                {
+                    module.name: self.unload_module(module.name, remove_from_set=False)
+                    for module in self.modules
+                },
+                timeouts["shutdown"],
+            )
+        )
 
         self.modules.clear()
-        self.loop.run_until_complete(self.cleanup_all_consumers())
+        self.loop.run_until_complete(self.cleanup_all_consumers(timeouts["shutdown"]))
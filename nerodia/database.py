@@ -0,0 +1,102 @@
+"""
+Creates database engines from the `database` configuration section.
+
+If no database URL is configured, a SQLite database is
+used. It is created under the filename "nerodia.db" in
+the `data` directory of the directory in which the
+application is run. If you wish to change this behaviour,
+either set the URL in the configuration or export an
+environment variable named NERODIA_DB_PATH with the
+full path towards the desired database file location.
+"""
+
+import os
+import pathlib
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, event, pool
+from sqlalchemy.engine import Engine
+
+
+DEFAULT_DB_PATH = pathlib.Path.cwd() / "data" / "nerodia.db"
+
+# Pragmas applied to every new SQLite connection, unless overridden through
+# the configuration. WAL lets readers proceed while a write is in progress and
+# `synchronous = NORMAL` is durable across application crashes in WAL mode.
+DEFAULT_SQLITE_PRAGMAS = {
+    "journal-mode": "wal",
+    "synchronous": "normal",
+    "mmap-size": 256 * 1024 * 1024,
+    "cache-size": -64 * 1024,
+    "busy-timeout": 5000,
+    "foreign-keys": "on",
+}
+DEFAULT_POOL_OPTIONS = {"size": 5, "max-overflow": 10, "recycle": 3600}
+
+
+def get_database_url(db_config: Optional[Dict[str, Any]]) -> str:
+    """Get the SQLAlchemy database URL to connect to.
+
+    Args:
+        db_config (Optional[Dict[str, Any]]):
+            The `database` section of the configuration, if present.
+
+    Returns:
+        str:
+            The configured URL, or a URL to the default SQLite database.
+    """
+
+    if db_config and db_config.get("url"):
+        return db_config["url"]
+
+    db_path = os.environ.get("NERODIA_DB_PATH", DEFAULT_DB_PATH)
+    return f"sqlite:///{db_path}"
+
+
+def create_engine_from_config(db_config: Optional[Dict[str, Any]]) -> Engine:
+    """Create a tuned database engine from the given configuration.
+
+    SQLite connections are set up with the configured pragmas, while
+    other databases use a connection pool sized as configured.
+
+    Args:
+        db_config (Optional[Dict[str, Any]]):
+            The `database` section of the configuration, if present.
+
+    Returns:
+        Engine:
+            An engine connected to the configured database.
+    """
+
+    db_config = db_config or {}
+    url = get_database_url(db_config)
+    pool_options = {**DEFAULT_POOL_OPTIONS, **db_config.get("pool", {})}
+
+    if not url.startswith("sqlite"):
+        return create_engine(
+            url,
+            pool_size=pool_options["size"],
+            max_overflow=pool_options["max-overflow"],
+            pool_recycle=pool_options["recycle"],
+            pool_pre_ping=True,
+        )
+
+    # Keep SQLite connections open in a pool so that the
+    # page cache and memory map survive between queries.
+    engine = create_engine(
+        url,
+        poolclass=pool.QueuePool,
+        pool_size=pool_options["size"],
+        max_overflow=pool_options["max-overflow"],
+        connect_args={"check_same_thread": False},
+    )
+    pragmas = {**DEFAULT_SQLITE_PRAGMAS, **db_config.get("sqlite", {})}
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name.replace('-', '_')} = {value}")
+        cursor.close()
+
+    return engine
@@ -4,8 +4,15 @@ import warnings
 from collections import OrderedDict, namedtuple
 from typing import Callable
 
+from .metrics import REGISTRY
+
 
 CacheValue = namedtuple("CacheValue", "value time")
+CACHE_LOOKUPS = REGISTRY.counter(
+    "nerodia_cache_lookups_total",
+    "Lookups in caches of `timed_async_cache`, by function and result.",
+    ["function", "result"],
+)
 
 
 def _method_cache_key_generator(*args, **kwargs) -> int:
@@ -54,6 +61,8 @@ def timed_async_cache(
     cache = OrderedDict()
 
     def decorator(wrapped):
+        hits = CACHE_LOOKUPS.labels(wrapped.__qualname__, "hit")
+        misses = CACHE_LOOKUPS.labels(wrapped.__qualname__, "miss")
 
         @functools.wraps(wrapped)
         async def wrapper(*args, **kwargs):
@@ -61,6 +70,7 @@ def timed_async_cache(
 
             value = cache.get(cache_key)
             if value is None:
+                misses.inc()
                 if len(cache) > max_size:
                     cache.popitem(last=False)
                 cache[cache_key] = CacheValue(
@@ -69,10 +79,14 @@ def timed_async_cache(
 
             # Check if the stored value has expired
             elif datetime.datetime.utcnow() - cache[cache_key].time > expire_after:
+                misses.inc()
                 cache[cache_key] = CacheValue(
                     await wrapped(*args, **kwargs), datetime.datetime.utcnow()
                 )
 
+            else:
+                hits.inc()
+
             return cache[cache_key].value
 
         return wrapper
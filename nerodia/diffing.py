@@ -0,0 +1,151 @@
+"""
+Finds the streams that changed between two poll cycles in bulk,
+instead of comparing the stream of every followed user in Python.
+
+Only online users can have changed, so the differ keeps the stream IDs
+of the users that were online when they were last polled, along with
+the IDs of every user polled so far. Like the state of the poller, this
+outlives a user not being polled for a while, so that a stream which
+started or ended meanwhile is still reported once it is polled again.
+
+With NumPy installed, the stream IDs are kept as integer arrays and
+compared with vectorized set operations. Without NumPy, they are kept
+in a dictionary and compared in Python, which still only touches the
+online users instead of all followed users. NumPy is only imported
+once a differ is created, so it is not loaded unless it is used.
+"""
+
+import itertools
+import operator
+from typing import List, Mapping, NamedTuple, Optional
+
+from .twitch import TwitchStream
+
+
+# Picks `(user_id, stream_id)` from a `TwitchStream`.
+_user_and_stream_id = operator.itemgetter(1, 0)
+
+
+class SnapshotDiff(NamedTuple):
+    # Users that went online.
+    online: List[int]
+    # Users that went offline.
+    offline: List[int]
+    # Users that are online with a different stream than before.
+    changed: List[int]
+
+
+class SnapshotDiffer:
+    """Compares the streams of every poll cycle against the previously seen streams.
+
+    Like the comparison of `TwitchStream`s, streams are compared by their ID,
+    so that changes to the title or thumbnail of a stream are not reported.
+    Users that are polled for the first time are not reported.
+    """
+
+    def __init__(self, use_numpy: Optional[bool] = None):
+        """Create a new snapshot differ which did not see any users yet.
+
+        Args:
+            use_numpy (Optional[bool]):
+                Whether to compare snapshots with NumPy, or `None`
+                to use NumPy if it is installed.
+        """
+
+        numpy = None if use_numpy is False else _import_numpy()
+        if use_numpy and numpy is None:
+            raise ValueError("Diffing snapshots with NumPy requires NumPy.")
+        self.use_numpy = numpy is not None
+        self._numpy = numpy
+        # The IDs of every user that was polled so far.
+        self._known = set()
+        # The stream IDs of the users that were online when they were last polled.
+        if numpy is None:
+            self._online = {}
+        else:
+            empty = numpy.empty(0, dtype=numpy.int64)
+            self._online = (empty, empty)
+
+    def diff(self, streams: Mapping[int, Optional[TwitchStream]]) -> SnapshotDiff:
+        """Compare the given snapshot to the previously seen streams and remember it.
+
+        Args:
+            streams (Mapping[int, Optional[TwitchStream]]):
+                Maps the Twitch user ID of every followed user to their
+                stream, or to `None` if they are offline.
+
+        Returns:
+            SnapshotDiff:
+                The users whose stream changed since they were last polled.
+        """
+
+        # Filtering and picking the IDs happens in C, without a Python-level loop.
+        pairs = map(_user_and_stream_id, filter(None, streams.values()))
+        if self._numpy is None:
+            diff = self._diff_dicts(streams, dict(pairs))
+        else:
+            online = self._numpy.fromiter(
+                itertools.chain.from_iterable(pairs), dtype=self._numpy.int64
+            ).reshape(-1, 2)
+            diff = self._diff_arrays(streams, online[:, 0], online[:, 1])
+
+        self._known.update(streams)
+        return diff
+
+    def _diff_arrays(self, streams, online, stream_ids) -> SnapshotDiff:
+        numpy = self._numpy
+        old_online, old_stream_ids = self._online
+
+        still_online, indices, old_indices = numpy.intersect1d(
+            online, old_online, assume_unique=True, return_indices=True
+        )
+        changed = still_online[stream_ids[indices] != old_stream_ids[old_indices]]
+        started = online[numpy.isin(online, old_online, invert=True)]
+        ended = numpy.isin(old_online, online, invert=True)
+        ended_users, ended_stream_ids = old_online[ended], old_stream_ids[ended]
+
+        # Only a few streams start or end every cycle, so these loops are short.
+        known = self._known
+        went_online = [user_id for user_id in started.tolist() if user_id in known]
+        polled = numpy.array(
+            [user_id in streams for user_id in ended_users.tolist()], dtype=bool
+        )
+
+        # Users that were not polled this time keep their previous stream.
+        self._online = (
+            numpy.concatenate((online, ended_users[~polled])),
+            numpy.concatenate((stream_ids, ended_stream_ids[~polled])),
+        )
+        return SnapshotDiff(went_online, ended_users[polled].tolist(), changed.tolist())
+
+    def _diff_dicts(self, streams, online) -> SnapshotDiff:
+        old_online = self._online
+
+        went_online, changed = [], []
+        for user_id, stream_id in online.items():
+            previous_stream_id = old_online.get(user_id)
+            if previous_stream_id is None:
+                if user_id in self._known:
+                    went_online.append(user_id)
+            elif previous_stream_id != stream_id:
+                changed.append(user_id)
+
+        went_offline = []
+        for user_id, stream_id in old_online.items():
+            if user_id not in online:
+                if user_id in streams:
+                    went_offline.append(user_id)
+                else:
+                    # Users that were not polled this time keep their previous stream.
+                    online[user_id] = stream_id
+
+        self._online = online
+        return SnapshotDiff(went_online, went_offline, changed)
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
@@ -0,0 +1,74 @@
+"""
+Creates the event loop that nerodia runs on,
+according to the `event-loop` configuration section.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+from typing import Any, Mapping, Optional
+
+
+log = logging.getLogger(__name__)
+
+
+def install_uvloop() -> bool:
+    """Make asyncio create uvloop event loops, if uvloop is installed.
+
+    Returns:
+        bool:
+            Whether uvloop was installed.
+    """
+
+    try:
+        import uvloop
+    except ImportError:
+        log.warning("uvloop is enabled but not installed, using the default loop.")
+        return False
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+def create_event_loop(
+    loop_config: Optional[Mapping[str, Any]] = None
+) -> asyncio.AbstractEventLoop:
+    """Create a new event loop and make it the current event loop.
+
+    Must be called before anything uses `asyncio.get_event_loop`,
+    such as the Twitch client, so that they use the new loop.
+
+    Args:
+        loop_config (Optional[Mapping[str, Any]]):
+            The `event-loop` section of the configuration,
+            or `None` to create a default event loop.
+
+    Returns:
+        asyncio.AbstractEventLoop:
+            The new event loop.
+    """
+
+    loop_config = loop_config or {}
+    if loop_config.get("uvloop", False):
+        install_uvloop()
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    executor_workers = loop_config.get("executor-workers")
+    if executor_workers is not None:
+        loop.set_default_executor(
+            concurrent.futures.ThreadPoolExecutor(max_workers=executor_workers)
+        )
+
+    if loop_config.get("debug", False):
+        loop.set_debug(True)
+    slow_callback_duration = loop_config.get("slow-callback-duration")
+    if slow_callback_duration is not None:
+        loop.slow_callback_duration = slow_callback_duration
+
+    log.info(
+        f"Created {loop.__class__.__module__}.{loop.__class__.__name__}"
+        f"{' in debug mode' if loop.get_debug() else ''}."
+    )
+    return loop
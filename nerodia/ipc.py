@@ -0,0 +1,355 @@
+"""
+Runs the producer and the consumers in separate processes,
+connected by a Unix socket, so that polling and the consumers
+do not compete for a single event loop and CPU core.
+
+The producer process listens on the socket and polls Twitch.
+Every consumer process connects to it and is represented in the
+producer by a `RemoteConsumer`, which forwards stream changes to
+the consumer process and asks it for its follows every cycle.
+
+Messages are JSON arrays, each prefixed with its length as a
+four-byte big-endian integer. Twitch streams and users are sent
+as arrays of their fields, in the order the fields are declared.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import struct
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+)
+
+from .base import Consumer, Module
+from .pollers import get_interests, stream_poller
+from .twitch import TwitchClient, TwitchStream, TwitchUser
+
+# Only imported for type checking, the differ is created by `__main__` if enabled.
+if TYPE_CHECKING:
+    from .diffing import SnapshotDiffer
+
+
+log = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = "data/nerodia.sock"
+# Seconds that a consumer process waits before reconnecting to the producer.
+RECONNECT_DELAY = 5
+# Seconds that the producer waits for a consumer process to send its follows.
+FOLLOWS_TIMEOUT = 30
+# Larger messages are rejected, as they can only come from a broken peer.
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+# Sent by a consumer process after connecting, with the names of its consumers.
+HELLO = "hello"
+# Sent by the producer after the hello, with the current stream of every user.
+STATE = "state"
+ONLINE = "online"
+OFFLINE = "offline"
+# Sent by the producer with a request ID, which the reply carries as well.
+FOLLOWS_REQUEST = "get-follows"
+FOLLOWS = "follows"
+
+_HEADER = struct.Struct(">I")
+
+PollerFunction = Callable[
+    [Set[Consumer], TwitchClient, Dict[int, Optional[TwitchStream]]], Awaitable[None]
+]
+
+
+async def read_message(reader: asyncio.StreamReader) -> List[Any]:
+    """Read a single message.
+
+    Raises:
+        asyncio.IncompleteReadError:
+            The connection was closed.
+        ValueError:
+            The message is too large or not valid JSON.
+    """
+
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if length > MAX_MESSAGE_SIZE:
+        raise ValueError(f"Got a message of {length} bytes, which is too large.")
+    return json.loads((await reader.readexactly(length)).decode())
+
+
+async def write_message(writer: asyncio.StreamWriter, *message: Any):
+    """Write a single message, whose parts are given as arguments."""
+
+    payload = json.dumps(message, separators=(",", ":")).encode()
+    writer.write(_HEADER.pack(len(payload)) + payload)
+    await writer.drain()
+
+
+class RemoteConsumer(Consumer):
+    """Represents the consumers of a connected consumer process in the producer.
+
+    Stream changes are only written to the socket, so the poller does
+    not wait for the consumer process to handle them. While a consumer
+    process is disconnected, the streams that only it follows are not
+    polled, so their changes are delivered once it reconnects. Changes
+    of streams that other processes follow as well are not delivered.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+        self._name = "remote"
+        self._closed = False
+        self._request_ids = itertools.count()
+        self._pending: Dict[int, asyncio.Future] = {}
+
+    @property
+    def name(self):
+        return self._name
+
+    async def initialize(self, loop: asyncio.AbstractEventLoop):
+        pass
+
+    async def cleanup(self):
+        self._closed = True
+        self._writer.close()
+
+    async def handshake(self, streams: Dict[int, Optional[TwitchStream]]):
+        """Wait for the hello of the consumer process and send it the stream state."""
+
+        message = await asyncio.wait_for(read_message(self._reader), 10)
+        if message[0] != HELLO:
+            raise ValueError(f"Expected a hello, but got {message[0]!r}.")
+
+        self._name = message[1]
+        await write_message(self._writer, STATE, list(streams.items()))
+
+    async def serve(self):
+        """Handle replies of the consumer process until it disconnects."""
+
+        try:
+            while True:
+                message = await read_message(self._reader)
+                if message[0] == FOLLOWS:
+                    future = self._pending.pop(message[1], None)
+                    if future is not None and not future.done():
+                        future.set_result(message[2])
+                else:
+                    log.warning(f"Got unexpected message {message[0]!r} from {self}.")
+        finally:
+            self._closed = True
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Disconnected."))
+            self._pending.clear()
+
+    async def stream_online(self, stream: TwitchStream, user: TwitchUser):
+        await self._send(ONLINE, stream, user)
+
+    async def stream_offline(self, user: TwitchUser):
+        await self._send(OFFLINE, user)
+
+    async def get_all_follows(self) -> Iterable[int]:
+        request_id = next(self._request_ids)
+        future = self._pending[request_id] = asyncio.get_event_loop().create_future()
+        try:
+            await self._send(FOLLOWS_REQUEST, request_id)
+            return await asyncio.wait_for(future, FOLLOWS_TIMEOUT)
+        except (asyncio.TimeoutError, ConnectionError):
+            log.warning(f"{self} did not send its follows, skipping them this cycle.")
+            return []
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def load_module(self, module: Module):
+        raise ValueError(f"Modules for {self} must be loaded in the consumer process.")
+
+    async def unload_module(self, module_name: str):
+        raise ValueError(
+            f"Modules for {self} must be unloaded in the consumer process."
+        )
+
+    async def _send(self, *message: Any):
+        if self._closed:
+            log.warning(f"Dropped a {message[0]!r} message for disconnected {self}.")
+            return
+
+        try:
+            await write_message(self._writer, *message)
+        except ConnectionError as e:
+            log.warning(f"Dropped a {message[0]!r} message for {self}: {e}")
+
+    def __str__(self):
+        return f"remote consumer `{self._name}`"
+
+
+def producer(
+    socket_path: str = DEFAULT_SOCKET_PATH, differ: Optional["SnapshotDiffer"] = None
+) -> PollerFunction:
+    """Create a stream poller which serves consumer processes over a Unix socket.
+
+    The returned coroutine function can be passed to `Nerodia.run` in place
+    of `stream_poller`. Every consumer process that connects is added to the
+    consumers of nerodia for as long as it stays connected.
+
+    Args:
+        socket_path (str):
+            The path of the Unix socket to listen on.
+        differ (Optional[SnapshotDiffer]):
+            If given, used by the poller to find the changed streams in bulk.
+
+    Returns:
+        PollerFunction:
+            The stream poller.
+    """
+
+    async def run(
+        consumers: Set[Consumer],
+        twitch_client: TwitchClient,
+        streams: Dict[int, Optional[TwitchStream]],
+    ):
+        async def on_connect(reader, writer):
+            remote = RemoteConsumer(reader, writer)
+            try:
+                await remote.handshake(streams)
+            except (
+                ConnectionError,
+                ValueError,
+                asyncio.IncompleteReadError,
+                asyncio.TimeoutError,
+            ) as e:
+                log.warning(f"Rejected a consumer process: {e}")
+                writer.close()
+                return
+
+            consumers.add(remote)
+            log.info(f"Connected {remote}.")
+            try:
+                await remote.serve()
+            except asyncio.IncompleteReadError:
+                log.info(f"Disconnected {remote}.")
+            except (ConnectionError, ValueError) as e:
+                log.warning(f"Disconnected {remote}: {e}")
+            finally:
+                consumers.discard(remote)
+                writer.close()
+
+        # A socket left over from a previous run would make binding fail.
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = await asyncio.start_unix_server(on_connect, path=socket_path)
+        log.info(f"Listening for consumer processes on `{socket_path}`.")
+
+        try:
+            await stream_poller(consumers, twitch_client, streams, differ)
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    return run
+
+
+def consumer(socket_path: str = DEFAULT_SOCKET_PATH) -> PollerFunction:
+    """Create a stream poller which receives changes from the producer process.
+
+    The returned coroutine function can be passed to `Nerodia.run` in place
+    of `stream_poller`. It connects to the producer, reconnecting whenever
+    the connection is lost, and passes every stream change on to the
+    consumers of this process.
+
+    Args:
+        socket_path (str):
+            The path of the Unix socket the producer listens on.
+
+    Returns:
+        PollerFunction:
+            The stream poller.
+    """
+
+    async def run(
+        consumers: Set[Consumer],
+        twitch_client: TwitchClient,
+        streams: Dict[int, Optional[TwitchStream]],
+    ):
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(socket_path)
+            except (FileNotFoundError, ConnectionError) as e:
+                log.warning(
+                    f"Could not connect to the producer at `{socket_path}`, "
+                    f"retrying in {RECONNECT_DELAY}s: {e}"
+                )
+                await asyncio.sleep(RECONNECT_DELAY)
+                continue
+
+            log.info(f"Connected to the producer at `{socket_path}`.")
+            try:
+                await _receive(consumers, streams, reader, writer)
+            except (ConnectionError, ValueError, asyncio.IncompleteReadError) as e:
+                log.warning(
+                    f"Lost the connection to the producer, "
+                    f"reconnecting in {RECONNECT_DELAY}s: {e}"
+                )
+            finally:
+                writer.close()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    return run
+
+
+async def _receive(
+    consumers: Set[Consumer],
+    streams: Dict[int, Optional[TwitchStream]],
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+):
+    name = "+".join(sorted(consumer.name for consumer in consumers))
+    await write_message(writer, HELLO, name)
+    # Which local consumers follow which streams, as of the last follows request.
+    # The producer requests the follows every cycle before sending its changes.
+    interests: Dict[int, List[Consumer]] = {}
+
+    while True:
+        message = await read_message(reader)
+        kind = message[0]
+
+        if kind == STATE:
+            streams.clear()
+            streams.update(
+                (user_id, None if stream is None else TwitchStream._make(stream))
+                for user_id, stream in message[1]
+            )
+
+        elif kind == ONLINE:
+            stream = TwitchStream._make(message[1])
+            user = TwitchUser._make(message[2])
+            streams[user.id] = stream
+            for local_consumer in interests.get(user.id, ()):
+                await _dispatch(local_consumer.stream_online(stream, user))
+
+        elif kind == OFFLINE:
+            user = TwitchUser._make(message[1])
+            streams[user.id] = None
+            for local_consumer in interests.get(user.id, ()):
+                await _dispatch(local_consumer.stream_offline(user))
+
+        elif kind == FOLLOWS_REQUEST:
+            interests = await get_interests(list(consumers))
+            await write_message(writer, FOLLOWS, message[1], sorted(interests))
+
+        else:
+            log.warning(f"Got unexpected message {kind!r} from the producer.")
+
+
+async def _dispatch(notification: Awaitable):
+    # A failing consumer must not take down the connection for the others.
+    try:
+        await notification
+    except Exception:
+        log.exception("A consumer failed to handle a stream change.")
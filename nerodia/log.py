@@ -0,0 +1,134 @@
+"""
+Sets up logging so that it does not block the event loop.
+
+Log records are put on a queue by the thread that logs them, and
+are formatted and written by a background thread. Repeated warnings
+from the same line of code are rate limited, so that bursts of
+failures - for example while Discord is unreachable - do not flood
+the log or the queue.
+"""
+
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+
+TEXT_FORMAT = "%(asctime)s | %(name)45s | %(funcName)22s | %(levelname)8s | %(message)s"
+DATE_FORMAT = "%d.%m.%y %H:%M:%S"
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as JSON objects, one per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        created = datetime.datetime.utcfromtimestamp(record.created)
+        entry = {
+            "time": created.isoformat() + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "function": record.funcName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry)
+
+
+class RateLimitFilter(logging.Filter):
+    """Drops repeated records from the same line of code.
+
+    At most `burst` records at or above `level` are let through per
+    line of code every `interval` seconds. The first record let through
+    after records were dropped mentions how many records were dropped.
+    """
+
+    def __init__(
+        self, interval: float = 60.0, burst: int = 10, level: int = logging.WARNING
+    ):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.level = level
+        # Maps `(pathname, lineno)` to `[window start, records let through, dropped]`.
+        self._windows: Dict[Tuple[str, int], List] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.level:
+            return True
+
+        key = (record.pathname, record.lineno)
+        window = self._windows.get(key)
+        if window is None or record.created - window[0] >= self.interval:
+            self._windows[key] = [record.created, 1, 0]
+            if window is not None and window[2]:
+                record.msg = (
+                    f"{record.msg} ({window[2]} similar messages were suppressed)"
+                )
+            return True
+
+        if window[1] < self.burst:
+            window[1] += 1
+            return True
+
+        window[2] += 1
+        return False
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """A queue handler that leaves formatting to the listener thread.
+
+    The standard `QueueHandler` formats records before enqueuing them,
+    so that they can be pickled. The queue never leaves this process,
+    so records can be passed along as they are.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(
+    log_config: Optional[Mapping[str, Any]] = None
+) -> logging.handlers.QueueListener:
+    """Route all logging through a queue to a background thread.
+
+    Args:
+        log_config (Optional[Mapping[str, Any]]):
+            The `logging` section of the configuration,
+            or `None` to use the defaults.
+
+    Returns:
+        logging.handlers.QueueListener:
+            The running listener which writes the records.
+            Stop it before exiting to write the remaining records.
+    """
+
+    log_config = log_config or {}
+
+    handler = logging.StreamHandler(sys.stderr)
+    if log_config.get("format", "text") == "json":
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+
+    log_queue = queue.Queue(-1)
+    queue_handler = _QueueHandler(log_queue)
+    rate_limit = log_config.get("rate-limit", {})
+    queue_handler.addFilter(
+        RateLimitFilter(rate_limit.get("interval", 60.0), rate_limit.get("burst", 10))
+    )
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(log_config.get("level", "INFO"))
+
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    return listener
@@ -0,0 +1,319 @@
+"""
+Collects metrics about nerodia and exposes them
+through a local HTTP endpoint in the Prometheus
+text format, for example for scraping by Prometheus.
+
+Metrics are created once on import of the module that
+updates them. Labelled metrics are bound to their label
+values through `labels` ahead of time, so that updating
+a metric on a hot path is a single attribute update.
+"""
+
+import asyncio
+import bisect
+import logging
+import math
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """Get the value at the given fraction of the sorted values.
+
+    Args:
+        values (Sequence[float]):
+            The values to pick from. Must not be empty.
+        fraction (float):
+            The percentile to pick, between `0` and `1`.
+
+    Returns:
+        float:
+            The value at the given percentile, using nearest-rank.
+    """
+
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class CounterChild:
+    """A counter bound to a set of label values."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class GaugeChild:
+    """A gauge bound to a set of label values."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+
+class HistogramChild:
+    """A histogram bound to a set of label values."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    """The base class of all metric types.
+
+    A metric without labels can be updated directly, since
+    it forwards updates to its single, unlabelled child.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.label_names:
+            self._unlabelled = self.labels()
+
+    def labels(self, *values: str):
+        """Get the child of this metric for the given label values.
+
+        Should be called once ahead of time instead of on every update.
+        """
+
+        if len(values) != len(self.label_names):
+            raise ValueError(
+                f"{self.name} expects the labels {self.label_names}, got {values}."
+            )
+
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[Tuple[str, str]], float]]:
+        """Yield `(name, labels, value)` for every sample of this metric."""
+
+        for values, child in self._children.items():
+            yield self.name, tuple(zip(self.label_names, values)), child.value
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        lines.extend(
+            f"{name}{_format_labels(labels)} {_format_value(value)}"
+            for name, labels, value in self.samples()
+        )
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def inc(self, amount: float = 1):
+        self._unlabelled.value += amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def _new_child(self) -> GaugeChild:
+        return GaugeChild()
+
+    def set(self, value: float):
+        self._unlabelled.value = value
+
+    def inc(self, amount: float = 1):
+        self._unlabelled.value += amount
+
+    def dec(self, amount: float = 1):
+        self._unlabelled.value -= amount
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labels)
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._unlabelled.observe(value)
+
+    def samples(self) -> Iterator[Tuple[str, Sequence[Tuple[str, str]], float]]:
+        for values, child in self._children.items():
+            labels = tuple(zip(self.label_names, values))
+            cumulative = 0
+            for bound, count in zip(self.buckets, child.counts):
+                cumulative += count
+                yield f"{self.name}_bucket", labels + (("le", repr(bound)),), cumulative
+            yield f"{self.name}_bucket", labels + (("le", "+Inf"),), child.count
+            yield f"{self.name}_sum", labels, child.sum
+            yield f"{self.name}_count", labels, child.count
+
+
+class Registry:
+    """Holds metrics and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """Add the given metric, replacing a metric of the same name.
+
+        Replacing allows reloading a module that defines metrics.
+        """
+
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+
+        return "".join(metric.render() + "\n" for metric in self._metrics.values())
+
+
+REGISTRY = Registry()
+
+
+async def _handle_request(
+    registry: Registry, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+):
+    try:
+        request_line = await reader.readline()
+        # Skip the headers, the request has no body.
+        while (await reader.readline()).strip():
+            pass
+
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] in (
+            "/",
+            "/metrics",
+        ):
+            status, content_type = "200 OK", CONTENT_TYPE
+            body = registry.render().encode()
+        else:
+            status, content_type = "404 Not Found", "text/plain"
+            body = b"Not Found\n"
+
+        writer.write(
+            (
+                f"HTTP/1.1 {status}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode()
+            + body
+        )
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_http_server(
+    host: str = "127.0.0.1", port: int = 9150, registry: Optional[Registry] = None
+) -> asyncio.AbstractServer:
+    """Serve the metrics of the given registry over HTTP.
+
+    Args:
+        host (str):
+            The address to listen on. Defaults to only
+            accepting connections from the local machine.
+        port (int):
+            The port to listen on.
+        registry (Optional[Registry]):
+            The registry to serve, or `None` for the default registry.
+
+    Returns:
+        asyncio.AbstractServer:
+            The running server. Close it to stop serving metrics.
+    """
+
+    registry = REGISTRY if registry is None else registry
+    server = await asyncio.start_server(
+        lambda reader, writer: _handle_request(registry, reader, writer), host, port
+    )
+    log.info(f"Serving metrics on http://{host}:{port}/metrics.")
+    return server
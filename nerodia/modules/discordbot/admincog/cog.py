@@ -5,17 +5,24 @@ that modify the configuration or change
 the loaded consumers and more on-the-fly.
 """
 
+import datetime
 import logging
+import pathlib
+from typing import Optional
 
 from discord import Colour, Embed
 from discord.ext import commands
 
+from .profiler import SamplingProfiler, format_function
 from nerodia.core import Nerodia
 from nerodia.consumers.discordbot import DiscordBotConsumer
 
 
 log = logging.getLogger(__name__)
 
+# Directory that full profiles are written to.
+PROFILE_DIRECTORY = pathlib.Path.cwd() / "data" / "profiles"
+
 
 class Administration:
     """Administrative commands, bot owner only."""
@@ -24,8 +31,11 @@ class Administration:
         self.bot = consumer.bot
         self.consumer = consumer
         self.nerodia = nerodia
+        self.profiler: Optional[SamplingProfiler] = None
 
     def __unload(self):
+        if self.profiler is not None and self.profiler.running:
+            self.profiler.stop()
         log.debug(f"Successfully unloaded {self.__class__.__name__} cog.")
 
     @commands.command(name="status")
@@ -38,6 +48,12 @@ class Administration:
             value=", ".join(c.name for c in self.nerodia.consumers),
         ).add_field(
             name="Loaded Modules", value=", ".join(m.name for m in self.nerodia.modules)
+        ).add_field(
+            name="Routing Table",
+            value=(
+                f"{len(self.consumer.routes)} routes, "
+                f"{self.consumer.routes.memory_usage()} bytes"
+            ),
         )
         await ctx.send(embed=result)
 
@@ -114,3 +130,92 @@ class Administration:
     async def reload_module_command(self, ctx, module_path: str):
         await ctx.invoke(self.unload_module_command, module_path)
         await ctx.invoke(self.load_module_command, module_path)
+
+    @commands.group(name="profile")
+    @commands.is_owner()
+    async def profile_group(self, ctx):
+        """Profile the event loop of the running bot."""
+
+    @profile_group.command(name="start")
+    @commands.is_owner()
+    async def profile_start_command(self, ctx, interval: float = 0.01):
+        """Start sampling the event loop every `interval` seconds."""
+
+        if self.profiler is not None and self.profiler.running:
+            error_info_embed = Embed(
+                title="Failed to start profiling:",
+                description="The profiler is already running.",
+                colour=Colour.red(),
+            )
+            return await ctx.send(embed=error_info_embed)
+
+        # Commands run on the event loop thread, which is the one to profile.
+        self.profiler = SamplingProfiler(interval=max(interval, 0.001))
+        self.profiler.start()
+        log.info(f"Started profiling every {self.profiler.interval}s.")
+        await ctx.send(
+            embed=Embed(
+                description=(
+                    f"Started profiling every {self.profiler.interval}s. "
+                    "Use `profile stop` to see the results."
+                ),
+                colour=Colour.green(),
+            )
+        )
+
+    @profile_group.command(name="stop")
+    @commands.is_owner()
+    async def profile_stop_command(self, ctx, top: int = 15):
+        """Stop profiling and show the `top` hottest functions."""
+
+        if self.profiler is None or not self.profiler.running:
+            error_info_embed = Embed(
+                title="Failed to stop profiling:",
+                description="The profiler is not running.",
+                colour=Colour.red(),
+            )
+            return await ctx.send(embed=error_info_embed)
+
+        self.profiler.stop()
+        log.info(f"Stopped profiling after {self.profiler.samples} samples.")
+        await ctx.invoke(self.profile_dump_command, top)
+
+    @profile_group.command(name="dump")
+    @commands.is_owner()
+    async def profile_dump_command(self, ctx, top: int = 15):
+        """Write the profile to disk and show the `top` hottest functions."""
+
+        if self.profiler is None:
+            error_info_embed = Embed(
+                title="Failed to dump the profile:",
+                description="Nothing was profiled yet. Use `profile start` first.",
+                colour=Colour.red(),
+            )
+            return await ctx.send(embed=error_info_embed)
+
+        profiler = self.profiler
+        timestamp = datetime.datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+        path = PROFILE_DIRECTORY / f"profile-{timestamp}.txt"
+        await self.bot.loop.run_in_executor(None, profiler.dump, path)
+
+        duration = profiler.duration or 1
+        lines = [f"{'own':>6} {'total':>6}  function"]
+        for stats in profiler.summary(top):
+            own = stats.own_seconds / duration
+            total = stats.total_seconds / duration
+            function = format_function(stats.function)
+            lines.append(f"{own:>6.1%} {total:>6.1%}  {function}")
+
+        # Stay below the embed description limit of 2048 characters.
+        table = "\n".join(lines)[:2000]
+        result = Embed(
+            title="Profile",
+            description=f"```\n{table}\n```",
+            colour=Colour.blue(),
+        ).add_field(
+            name="Samples",
+            value=f"{profiler.samples} in {profiler.duration:.1f}s",
+        ).add_field(
+            name="Idle", value=f"{profiler.idle_seconds / duration:.1%}"
+        ).add_field(name="Full Profile", value=f"`{path}`")
+        await ctx.send(embed=result)
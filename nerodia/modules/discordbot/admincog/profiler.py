@@ -0,0 +1,187 @@
+"""
+Contains a sampling profiler that can be switched
+on and off while nerodia is running, to find out
+where the event loop spends its time under real load.
+"""
+
+import collections
+import pathlib
+import sys
+import selectors
+import threading
+import time
+from typing import Counter, List, NamedTuple, Optional, Tuple
+
+
+# A function in the profile, as `(filename, first line number, function name)`.
+FunctionKey = Tuple[str, int, str]
+# The asyncio event loop waits for I/O in these functions while it has nothing to do.
+_IDLE_CODES = frozenset(
+    value.select.__code__
+    for value in vars(selectors).values()
+    if isinstance(value, type) and issubclass(value, selectors.BaseSelector)
+)
+
+
+class FunctionStats(NamedTuple):
+    function: FunctionKey
+    # Seconds in which the function was running itself.
+    own_seconds: float
+    # Seconds in which the function was anywhere on the stack.
+    total_seconds: float
+
+
+def format_function(function: FunctionKey) -> str:
+    filename, line, name = function
+    return f"{name} ({pathlib.Path(filename).name}:{line})"
+
+
+class SamplingProfiler:
+    """Periodically samples the stack of a thread from a background thread.
+
+    Unlike `cProfile`, this does not hook into every function call,
+    so the profiled thread runs at nearly full speed and the profiler
+    can be left running in production. The results are statistical.
+
+    The sampling thread has to wait for the GIL while the profiled thread
+    is busy, so samples are taken less often during CPU-bound work. To not
+    underrepresent such work, every sample is weighted with the time that
+    passed since the previous sample.
+
+    Samples in which the event loop is waiting for I/O in its selector
+    are counted as idle time instead of being kept as a stack, so that
+    they do not dominate the profile of a mostly idle event loop.
+    """
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = 0.01):
+        """Create a new sampling profiler.
+
+        Args:
+            thread_id (Optional[int]):
+                The identifier of the thread to profile, or
+                `None` to profile the thread creating the profiler.
+            interval (float):
+                Seconds to wait between two samples.
+        """
+
+        self.thread_id = threading.get_ident() if thread_id is None else thread_id
+        self.interval = interval
+        self.samples = 0
+        # Seconds in which the profiled thread was waiting in the selector.
+        self.idle_seconds = 0.0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        # Maps sampled stacks to the seconds they were sampled for.
+        self._stacks: Counter[Tuple[FunctionKey, ...]] = collections.Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    @property
+    def duration(self) -> float:
+        """Seconds that the profiler has been sampling for."""
+
+        if self.started_at is None:
+            return 0.0
+        end = time.monotonic() if self.stopped_at is None else self.stopped_at
+        return end - self.started_at
+
+    def start(self):
+        """Start sampling in a background thread."""
+
+        if self.running:
+            raise RuntimeError("The profiler is already running.")
+
+        self._stop.clear()
+        self.started_at = time.monotonic()
+        self.stopped_at = None
+        self._thread = threading.Thread(
+            target=self._sample_forever, name="nerodia-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling. The collected samples are kept."""
+
+        if not self.running:
+            raise RuntimeError("The profiler is not running.")
+
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.stopped_at = time.monotonic()
+
+    def summary(self, top: int = 15) -> List[FunctionStats]:
+        """Get the functions which were running for the longest time.
+
+        Args:
+            top (int):
+                The amount of functions to return.
+
+        Returns:
+            List[FunctionStats]:
+                The functions with the most own time, descending.
+        """
+
+        own = collections.Counter()
+        total = collections.Counter()
+        for stack, seconds in self._snapshot():
+            own[stack[-1]] += seconds
+            # Count recursive functions only once per sample.
+            for function in set(stack):
+                total[function] += seconds
+
+        return [
+            FunctionStats(function, own_seconds, total[function])
+            for function, own_seconds in own.most_common(top)
+        ]
+
+    def dump(self, path: pathlib.Path):
+        """Write every sampled stack to the given file.
+
+        The stacks are written in the collapsed format read by
+        flame graph tools, with one `outer;...;inner <microseconds>`
+        line per distinct stack, outermost frame first.
+        """
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("w") as f:
+            for stack, seconds in sorted(self._snapshot()):
+                microseconds = round(seconds * 1e6)
+                f.write(";".join(map(format_function, stack)) + f" {microseconds}\n")
+
+    def _snapshot(self) -> List[Tuple[Tuple[FunctionKey, ...], int]]:
+        with self._lock:
+            return list(self._stacks.items())
+
+    def _sample_forever(self):
+        last_sample = time.monotonic()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                # The profiled thread has exited.
+                return
+            now = time.monotonic()
+
+            if frame.f_code in _IDLE_CODES:
+                with self._lock:
+                    self.idle_seconds += now - last_sample
+                    self.samples += 1
+                last_sample = now
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            stack.reverse()
+
+            with self._lock:
+                self._stacks[tuple(stack)] += now - last_sample
+                self.samples += 1
+            last_sample = now
@@ -1,16 +1,49 @@
 import asyncio
 import logging
+import time
 import traceback
-from typing import List, Set
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
 
 from .base import Consumer
-from .twitch import TwitchClient
+from .metrics import REGISTRY
+from .twitch import TwitchClient, TwitchStream
 
+# Only imported for type checking, the differ is created by `__main__` if enabled.
+if TYPE_CHECKING:
+    from .diffing import SnapshotDiffer
 
-log = logging.getLogger(__name__)
 
+log = logging.getLogger(__name__)
 
-async def get_all_follows(consumers: List[Consumer]) -> Set[str]:
+# Seconds to wait between two poll cycles.
+POLL_INTERVAL = 10
+
+POLL_SECONDS = REGISTRY.histogram(
+    "nerodia_poll_seconds", "Seconds taken by a poll cycle, including dispatch."
+)
+STREAMS_CHECKED = REGISTRY.gauge(
+    "nerodia_streams_checked", "Streams checked in the last poll cycle."
+)
+STREAM_CHANGES = REGISTRY.counter(
+    "nerodia_stream_changes_total", "Stream status changes detected.", ["status"]
+)
+STREAMS_ONLINE = STREAM_CHANGES.labels("online")
+STREAMS_OFFLINE = STREAM_CHANGES.labels("offline")
+DISPATCH_SECONDS = REGISTRY.histogram(
+    "nerodia_dispatch_seconds",
+    "Seconds taken by a consumer to handle a stream change.",
+    ["consumer"],
+)
+DISPATCH_ERRORS = REGISTRY.counter(
+    "nerodia_dispatch_errors_total",
+    "Stream changes that a consumer failed to handle.",
+    ["consumer"],
+)
+# Maps consumer names to their dispatch metrics, so labels are only bound once.
+_bound_dispatch_metrics = {}
+
+
+async def get_all_follows(consumers: List[Consumer]) -> Set[int]:
     """Get all followed streams across all consumers.
 
     Args:
@@ -18,8 +51,8 @@ async def get_all_follows(consumers: List[Consumer]) -> Set[str]:
             A list of enabled consumers.
 
     Returns:
-        Set[str]:
-            A list of Twitch stream names that are followed,
+        Set[int]:
+            A set of Twitch user IDs of streams that are followed,
             retrieved across all enabled consumers.
     """
 
@@ -28,7 +61,130 @@ async def get_all_follows(consumers: List[Consumer]) -> Set[str]:
     }
 
 
-async def _stream_poller(consumers: List[Consumer], twitch_client: TwitchClient):
+async def get_interests(consumers: List[Consumer]) -> Dict[int, List[Consumer]]:
+    """Find out which consumers follow which streams.
+
+    Args:
+        consumers (List[Consumer]):
+            A list of enabled consumers.
+
+    Returns:
+        Dict[int, List[Consumer]]:
+            Maps the Twitch user ID of every followed stream
+            to the consumers that follow the stream.
+    """
+
+    # Asked concurrently, so that a slow consumer does not hold up the others.
+    all_follows = await asyncio.gather(
+        *(consumer.get_all_follows() for consumer in consumers)
+    )
+    interests = {}
+    for consumer, follows in zip(consumers, all_follows):
+        for follow in set(follows):
+            subscribers = interests.get(follow)
+            if subscribers is None:
+                interests[follow] = [consumer]
+            else:
+                subscribers.append(consumer)
+    return interests
+
+
+async def poll_once(
+    consumers: List[Consumer],
+    twitch_client: TwitchClient,
+    state: Dict[int, Optional[TwitchStream]],
+    differ: Optional["SnapshotDiffer"] = None,
+) -> int:
+    """Run a single poll cycle.
+
+    Fetches the streams of all followed users, compares them against
+    the given state and notifies the consumers following a stream about
+    its changes. Users that were not seen before are only recorded.
+
+    Args:
+        consumers (List[Consumer]):
+            A list of enabled consumers.
+        twitch_client (TwitchClient):
+            The Twitch client to execute requests with.
+        state (Dict[int, Optional[TwitchStream]]):
+            The stream of every followed user from the previous cycle,
+            or `None` for offline users. Updated with the new streams.
+        differ (Optional[SnapshotDiffer]):
+            If given, used to find the changed streams in bulk instead
+            of comparing against `state` stream by stream. Must be
+            passed to every cycle, as it keeps its own state.
+
+    Returns:
+        int:
+            The amount of stream changes that consumers were notified about.
+    """
+
+    cycle_start = time.monotonic()
+    # Consumers may be added or removed while the cycle is running.
+    interests = await get_interests(list(consumers))
+    # Followed users are fetched in bulk when they are new or expired, so that
+    # changes are resolved from memory instead of with one request per burst.
+    stream_information, _ = await asyncio.gather(
+        twitch_client.get_streams_by_id(*interests),
+        twitch_client.warm_users_by_id(*interests),
+    )
+    STREAMS_CHECKED.set(len(stream_information))
+
+    if differ is None:
+        changed = [
+            user_id
+            for user_id, stream in stream_information.items()
+            if state.get(user_id, stream) != stream
+        ]
+    else:
+        diff = differ.diff(stream_information)
+        changed = diff.online + diff.changed + diff.offline
+
+    # Resolved from the warmed up users, instead of one request per change.
+    users = await twitch_client.resolve_users_by_id(*changed) if changed else {}
+    for user_id in changed:
+        stream = stream_information[user_id]
+        is_online = stream is not None
+        (STREAMS_ONLINE if is_online else STREAMS_OFFLINE).inc()
+        user = users.get(user_id)
+        if user is None:
+            log.warning(f"Skipping the stream change of unknown user {user_id}.")
+            continue
+        for consumer in interests[user_id]:
+            dispatch_seconds, dispatch_errors = _dispatch_metrics(consumer)
+            dispatch_start = time.monotonic()
+            try:
+                if is_online:
+                    await consumer.stream_online(stream, user)
+                else:
+                    await consumer.stream_offline(user)
+            except Exception:
+                dispatch_errors.inc()
+                raise
+            finally:
+                dispatch_seconds.observe(time.monotonic() - dispatch_start)
+
+    state.update(stream_information)
+    POLL_SECONDS.observe(time.monotonic() - cycle_start)
+    return len(changed)
+
+
+def _dispatch_metrics(consumer: Consumer):
+    bound = _bound_dispatch_metrics.get(consumer.name)
+    if bound is None:
+        bound = _bound_dispatch_metrics[consumer.name] = (
+            DISPATCH_SECONDS.labels(consumer.name),
+            DISPATCH_ERRORS.labels(consumer.name),
+        )
+    return bound
+
+
+async def _stream_poller(
+    consumers: List[Consumer],
+    twitch_client: TwitchClient,
+    state: Optional[Dict[int, Optional[TwitchStream]]] = None,
+    differ: Optional["SnapshotDiffer"] = None,
+):
     """The actual Twitch stream poller.
 
     Args:
@@ -36,6 +192,11 @@ async def _stream_poller(consumers: List[Consumer], twitch_client: TwitchClient)
             A list of enabled consumers.
         twitch_client (TwitchClient):
             The Twitch client to execute requests with.
+        state (Optional[Dict[int, Optional[TwitchStream]]]):
+            If given, kept up to date with the current stream
+            of every followed user, or `None` for offline users.
+        differ (Optional[SnapshotDiffer]):
+            If given, used to find the changed streams in bulk.
 
     Notes:
         If this coroutine is started directly as a `asyncio.Task`,
@@ -44,28 +205,18 @@ async def _stream_poller(consumers: List[Consumer], twitch_client: TwitchClient)
 
     log.info("Started Twitch stream poller.")
 
-    old_data = {}
-
+    state = {} if state is None else state
     while True:
-        all_follows = await get_all_follows(consumers)
-        stream_information = await twitch_client.get_streams(*all_follows)
-
-        for username, stream in stream_information.items():
-
-            if old_data.get(username, stream) != stream:
-                is_online = stream is not None
-                user = await twitch_client.get_user(username)
-                for consumer in consumers:
-                    if is_online:
-                        await consumer.stream_online(stream, user)
-                    else:
-                        await consumer.stream_offline(user)
-
-        await asyncio.sleep(10)
-        old_data.update(stream_information)
+        await poll_once(consumers, twitch_client, state, differ)
+        await asyncio.sleep(POLL_INTERVAL)
 
 
-async def stream_poller(consumers: List[Consumer], twitch_client: TwitchClient):
+async def stream_poller(
+    consumers: List[Consumer],
+    twitch_client: TwitchClient,
+    state: Optional[Dict[int, Optional[TwitchStream]]] = None,
+    differ: Optional["SnapshotDiffer"] = None,
+):
     """Starts the stream poller task and catches any exceptions thrown.
 
     Args:
@@ -73,10 +224,15 @@ async def stream_poller(consumers: List[Consumer], twitch_client: TwitchClient):
             A list of set up consumers.
         twitch_client (TwitchClient):
             The Twitch client to execute requests with.
+        state (Optional[Dict[int, Optional[TwitchStream]]]):
+            If given, kept up to date with the current stream
+            of every followed user, or `None` for offline users.
+        differ (Optional[SnapshotDiffer]):
+            If given, used to find the changed streams in bulk.
     """
 
     try:
-        await _stream_poller(consumers, twitch_client)
+        await _stream_poller(consumers, twitch_client, state, differ)
     except asyncio.CancelledError:
         log.info("Twitch stream poller was cancelled.")
     except Exception as e:
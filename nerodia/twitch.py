@@ -1,17 +1,53 @@
 import asyncio
+import re
+import time
+from collections import OrderedDict
 from datetime import timedelta
-from typing import Dict, Optional, List, NamedTuple, Mapping, Union
+from typing import Dict, Optional, List, NamedTuple, Mapping, Sequence, Tuple, Union
 
 import aiohttp
 import backoff
 
 from .decorators import timed_async_cache
+from .metrics import REGISTRY
 
 
 BASE_URL = "https://api.twitch.tv/helix"
 USER_ENDPOINT = BASE_URL + "/users"
 STREAM_ENDPOINT = BASE_URL + "/streams"
 JSON = Union[str, int, float, bool, None, Mapping[str, "JSON"], List["JSON"]]
+LOGIN_PATTERN = re.compile(r"^[a-z0-9_]{1,25}$")
+# How long users are kept in the cache of users by ID, in seconds.
+USER_CACHE_EXPIRY = timedelta(hours=6).total_seconds()
+# The maximum amount of users kept in the cache of users by ID,
+# unless more users are warmed up through `warm_users_by_id`.
+USER_CACHE_SIZE = 100_000
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "nerodia_helix_request_seconds", "Seconds taken by requests to the Twitch API."
+)
+RESPONSES = REGISTRY.counter(
+    "nerodia_helix_responses_total",
+    "Responses from the Twitch API by status code.",
+    ["status"],
+)
+RATELIMIT_REMAINING = REGISTRY.gauge(
+    "nerodia_helix_ratelimit_remaining",
+    "Requests left in the current Twitch API rate limit window.",
+)
+# Maps status codes to their response counters, so labels are only bound once.
+_responses_by_status = {}
+
+
+def _observe_response(status: int, headers: Optional[Mapping[str, str]]):
+    counter = _responses_by_status.get(status)
+    if counter is None:
+        counter = _responses_by_status[status] = RESPONSES.labels(str(status))
+    counter.inc()
+
+    remaining = headers.get("Ratelimit-Remaining") if headers else None
+    if remaining is not None:
+        RATELIMIT_REMAINING.set(int(remaining))
 
 
 class TwitchStream(NamedTuple):
@@ -23,8 +59,16 @@ class TwitchStream(NamedTuple):
     def __eq__(self, other):
         """Provide a custom equality check that ignores game / thumbnail URL updates."""
 
+        if not isinstance(other, TwitchStream):
+            return NotImplemented
         return self.id == other.id and self.user_id == other.user_id
 
+    def __ne__(self, other):
+        """Negate the custom equality check, instead of comparing all fields."""
+
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
     @classmethod
     def from_data(cls, data: JSON):
         """Create a new `TwitchStream` based on data returned by the `/streams` endpoint.
@@ -93,6 +137,14 @@ class TwitchClient:
             raise_for_status=True,
             headers={"Client-ID": client_id},
         )
+        # Maps user IDs to users returned by the API, or to `None` for IDs that
+        # were requested but not found, with the time they were fetched, so that
+        # users can be reused without further requests.
+        # Ordered by the time they were fetched, oldest first.
+        self._users_by_id: Dict[
+            int, Tuple[Optional[TwitchUser], float]
+        ] = OrderedDict()
+        self._users_cache_size = USER_CACHE_SIZE
 
     def __del__(self):
         """Close the `aiohttp.ClientSession` to prevent any warnings."""
@@ -126,8 +178,17 @@ class TwitchClient:
                 as a parsed Python object.
         """
 
-        async with self._cs.get(url, **kwargs) as resp:
-            return await resp.json()
+        start = time.monotonic()
+        try:
+            async with self._cs.get(url, **kwargs) as resp:
+                _observe_response(resp.status, resp.headers)
+                return await resp.json()
+        except aiohttp.ClientResponseError as e:
+            # Raised for error statuses before the response is returned.
+            _observe_response(e.status, e.headers)
+            raise
+        finally:
+            REQUEST_SECONDS.observe(time.monotonic() - start)
 
     async def _post(self, url: str, **kwargs) -> int:
         """Execute HTTP POST.
@@ -187,42 +248,195 @@ class TwitchClient:
 
         res = await self._get(USER_ENDPOINT + "?login=" + "&login=".join(user_names))
 
-        return [TwitchUser.from_data(user_data) for user_data in res["data"]]
+        return self._remember_users(res["data"])
+
+    async def resolve_users(self, *user_names: str) -> Dict[str, TwitchUser]:
+        """Resolve the given usernames with as few requests as possible.
+
+        The usernames are normalized to lowercase and deduplicated, names
+        that can not be valid Twitch logins are dropped, and the remaining
+        names are looked up in concurrent chunks of 100 through `get_users`.
+
+        Args:
+            user_names (str):
+                An argument list of usernames to resolve.
+
+        Returns:
+            Dict[str, TwitchUser]:
+                Maps the logins of all users that could be
+                found to their `TwitchUser` instances.
+        """
+
+        logins = [
+            login
+            for login in dict.fromkeys(name.strip().lower() for name in user_names)
+            if LOGIN_PATTERN.match(login)
+        ]
+        login_chunks = (logins[n:n + 100] for n in range(0, len(logins), 100))
+        results = await asyncio.gather(
+            *(self.get_users(*login_chunk) for login_chunk in login_chunks)
+        )
+
+        return {user.name: user for users in results for user in users}
+
+    async def get_user_by_id(self, user_id: int) -> Optional[TwitchUser]:
+        """Obtain information about a single Twitch user by their ID.
+
+        Args:
+            user_id (int):
+                The ID of the user for which information should be returned.
+
+        Returns:
+            Optional[TwitchUser]:
+                A populated instance of `TwitchUser` if a user
+                with the given ID exists, or `None` otherwise.
+        """
+
+        user_list = await self.get_users_by_id(user_id)
+        if not user_list:
+            return None
+        return user_list[0]
+
+    @timed_async_cache(expire_after=timedelta(hours=6))
+    async def get_users_by_id(self, *user_ids: int) -> List[TwitchUser]:
+        """Obtain a list of Twitch users with the specified IDs.
+
+        Args:
+            user_ids (int):
+                The list of user IDs whose Twitch user
+                information should be returned.
+
+        Returns:
+            List[TwitchUser]:
+                A list of `TwitchUser` instances for the given data.
+                If a user could not be found, they will be omitted
+                from the resulting List.
+
+        Notes:
+            This function's result for a specific set of
+            arguments is cached for at least 6 hours.
+        """
+
+        return await self._fetch_users_by_id(user_ids)
+
+    async def resolve_users_by_id(self, *user_ids: int) -> Dict[int, TwitchUser]:
+        """Resolve the given user IDs with as few requests as possible.
+
+        Users that were returned by any request for users within the
+        last 6 hours are taken from memory. The remaining user IDs are
+        looked up in concurrent chunks of 100. Users that were warmed up
+        through `warm_users_by_id` are resolved without any requests.
+
+        Args:
+            user_ids (int):
+                An argument list of user IDs to resolve.
 
-    async def get_streams(
-        self, *stream_logins: str
-    ) -> Dict[str, Optional[TwitchStream]]:
-        """Obtain a mapping of given usernames to streams.
+        Returns:
+            Dict[int, TwitchUser]:
+                Maps the IDs of all users that could be
+                found to their `TwitchUser` instances.
+        """
+
+        result = {}
+        missing = []
+        now = time.monotonic()
+        for user_id in dict.fromkeys(user_ids):
+            cached = self._users_by_id.get(user_id)
+            if cached is None or now - cached[1] >= USER_CACHE_EXPIRY:
+                missing.append(user_id)
+            elif cached[0] is not None:
+                result[user_id] = cached[0]
+
+        results = await self._fetch_users_in_chunks(missing)
+        result.update((user.id, user) for users in results for user in users)
+        return result
+
+    async def warm_users_by_id(self, *user_ids: int):
+        """Fetch the given users into memory, unless they already are.
+
+        The poller calls this with every followed user, so that the users
+        of stream changes are resolved by `resolve_users_by_id` without any
+        requests. Users are fetched in bulk when they are followed and once
+        every 6 hours, instead of once for every change. The cache of users
+        is grown to hold at least the given users.
 
         Args:
-            stream_logins (str):
-                An argument list of usernames for which stream
-                should be obtained. This method assumes that
-                every specified login is a valid, existing user.
+            user_ids (int):
+                An argument list of user IDs to fetch.
+        """
+
+        self._users_cache_size = max(USER_CACHE_SIZE, len(user_ids))
+        self._drop_expired_users(time.monotonic())
+        missing = list(set(user_ids).difference(self._users_by_id))
+        await self._fetch_users_in_chunks(missing)
+
+    async def _fetch_users_in_chunks(
+        self, user_ids: List[int]
+    ) -> List[List[TwitchUser]]:
+        id_chunks = (user_ids[n:n + 100] for n in range(0, len(user_ids), 100))
+        return await asyncio.gather(
+            *(self._fetch_users_by_id(id_chunk) for id_chunk in id_chunks)
+        )
+
+    async def _fetch_users_by_id(self, user_ids: Sequence[int]) -> List[TwitchUser]:
+        params = "&id=".join(str(user_id) for user_id in user_ids)
+        res = await self._get(USER_ENDPOINT + "?id=" + params)
+
+        return self._remember_users(res["data"], user_ids)
+
+    def _remember_users(
+        self, users_data: List[JSON], requested_ids: Sequence[int] = ()
+    ) -> List[TwitchUser]:
+        now = time.monotonic()
+        users = [TwitchUser.from_data(user_data) for user_data in users_data]
+        cache = self._users_by_id
+        # Requested IDs without a user are remembered as well, so that
+        # deleted users are not requested again until they expire.
+        for user_id in requested_ids:
+            cache.pop(user_id, None)
+            cache[user_id] = (None, now)
+        for user in users:
+            cache.pop(user.id, None)
+            cache[user.id] = (user, now)
+
+        self._drop_expired_users(now)
+        return users
+
+    def _drop_expired_users(self, now: float):
+        # The oldest entries come first, so expired entries are dropped from the
+        # front, along with the oldest ones while the cache is too large.
+        cache = self._users_by_id
+        while cache and (
+            len(cache) > self._users_cache_size
+            or now - next(iter(cache.values()))[1] >= USER_CACHE_EXPIRY
+        ):
+            cache.popitem(last=False)
+
+    async def get_streams_by_id(
+        self, *user_ids: int
+    ) -> Dict[int, Optional[TwitchStream]]:
+        """Obtain a mapping of given user IDs to streams.
+
+        Args:
+            user_ids (int):
+                An argument list of user IDs for which streams should be obtained.
 
         Returns:
-            Dict[str, Optional[TwitchStream]]:
-                Maps given usernames to `TwitchStream` instances.
+            Dict[int, Optional[TwitchStream]]:
+                Maps given user IDs to `TwitchStream` instances.
                 If the given user is streaming, the value represents
                 information about the stream. If the stream is offline,
                 this will be set to `None` instead.
         """
 
-        result = {}
-        login_chunks = (
-            stream_logins[n:n + 100] for n in range(0, len(stream_logins), 100)
-        )
+        result = dict.fromkeys(user_ids)
+        id_chunks = (user_ids[n:n + 100] for n in range(0, len(user_ids), 100))
 
-        for login_chunk in login_chunks:
-            users = await self.get_users(*login_chunk)
-            params = "&user_id=".join(str(user.id) for user in users)
-            res = await self._get(STREAM_ENDPOINT + "?user_id=" + params)
-            streams = [
-                TwitchStream.from_data(stream_data) for stream_data in res["data"]
-            ]
-            for user in users:
-                result[user.name] = next(
-                    (stream for stream in streams if stream.user_id == user.id), None
-                )
+        for id_chunk in id_chunks:
+            params = "&user_id=".join(str(user_id) for user_id in id_chunk)
+            res = await self._get(STREAM_ENDPOINT + "?first=100&user_id=" + params)
+            for stream_data in res["data"]:
+                stream = TwitchStream.from_data(stream_data)
+                result[stream.user_id] = stream
 
         return result
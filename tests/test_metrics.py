@@ -0,0 +1,20 @@
+from nerodia.metrics import percentile
+
+
+def test_percentile_odd_length():
+    assert percentile([1, 2, 3], 0.5) == 2
+    assert percentile([5, 1, 4, 2, 3], 0.5) == 3
+    assert percentile([1, 2, 3, 4, 5], 0.99) == 5
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 11))
+    assert percentile(values, 0.25) == 3
+    assert percentile(values, 0.5) == 5
+    assert percentile(values, 0.99) == 10
+
+
+def test_percentile_bounds():
+    assert percentile([7, 3], 0.0) == 3
+    assert percentile([7, 3], 1.0) == 7
+    assert percentile([4], 0.5) == 4
@@ -0,0 +1,56 @@
+import asyncio
+from typing import Iterable, List
+
+from benchmarks.pipeline import FakeHelix
+from nerodia.base import Consumer
+from nerodia.pollers import poll_once
+from nerodia.twitch import TwitchStream, TwitchUser
+
+
+class FollowingConsumer(Consumer):
+    """A consumer that follows the given users and records its notifications."""
+
+    name = "follower"
+
+    def __init__(self, follows: List[int]):
+        self.follows = follows
+        self.notified: List[TwitchUser] = []
+
+    async def initialize(self, loop: asyncio.AbstractEventLoop):
+        pass
+
+    async def cleanup(self):
+        pass
+
+    async def stream_online(self, stream: TwitchStream, user: TwitchUser):
+        self.notified.append(user)
+
+    async def stream_offline(self, user: TwitchUser):
+        self.notified.append(user)
+
+    async def get_all_follows(self) -> Iterable[int]:
+        return self.follows
+
+    async def load_module(self, module):
+        pass
+
+    async def unload_module(self, module):
+        pass
+
+
+def test_burst_of_go_lives_needs_no_user_requests():
+    follows = list(range(1, 1001))
+    helix = FakeHelix()
+    consumer = FollowingConsumer(follows)
+    state = {}
+    loop = asyncio.get_event_loop()
+
+    # The first cycle of a cold client warms up all followed users.
+    loop.run_until_complete(poll_once([consumer], helix, state))
+    assert helix.user_requests == 10
+    assert not consumer.notified
+
+    helix.toggle(follows[:200])
+    loop.run_until_complete(poll_once([consumer], helix, state))
+    assert helix.user_requests == 10
+    assert [user.id for user in consumer.notified] == follows[:200]